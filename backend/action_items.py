@@ -0,0 +1,89 @@
+# action_items.py – Queries over the normalized action_items table
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import Database
+
+ACTION_ITEM_STATUSES = ("open", "in_progress", "done")
+EDITABLE_FIELDS = ("status", "assignee", "task", "due")
+
+
+def _item(row: tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "meeting_id": row[1],
+        "meeting_title": row[2],
+        "assignee": row[3],
+        "task": row[4],
+        "due": row[5],
+        "context": row[6],
+        "status": row[7],
+        "created_at": row[8],
+        "updated_at": row[9],
+    }
+
+
+ITEM_SELECT = """SELECT a.id, a.meeting_id, m.title, a.assignee, a.task, a.due, a.context, a.status,
+                        a.created_at, a.updated_at
+                 FROM action_items a JOIN meetings m ON m.id = a.meeting_id"""
+
+
+def meeting_action_items(db: Database, meeting_id: int) -> List[Dict[str, Any]]:
+    """A meeting's items in their original order, in the `AnalyzeResponse.action_items` shape.
+
+    Ids and status are left to `list_action_items(meeting_id=...)`.
+    """
+    rows = db.fetchall(
+        "SELECT assignee, task, due, context FROM action_items WHERE meeting_id = ? ORDER BY position",
+        (meeting_id,),
+    )
+    return [{"assignee": r[0], "task": r[1], "due": r[2], "context": r[3]} for r in rows]
+
+
+def list_action_items(
+    db: Database,
+    user_id: str,
+    status: Optional[str] = None,
+    assignee: Optional[str] = None,
+    due_before: Optional[str] = None,
+    due_after: Optional[str] = None,
+    meeting_id: Optional[int] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """One page of the user's action items, soonest due first (undated last), plus the next offset.
+
+    `status` and `assignee` (case-insensitive) hit the (user_id, status, due)
+    and (user_id, assignee) indexes; `due_before` / `due_after` compare
+    YYYY-MM-DD strings inclusively.
+    """
+    clauses, params = ["a.user_id = ?"], [user_id]
+    for clause, value in (
+        ("a.status = ?", status),
+        ("a.assignee = ?", assignee),
+        ("a.due <= ?", due_before),
+        ("a.due >= ?", due_after),
+        ("a.meeting_id = ?", meeting_id),
+    ):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    rows = db.fetchall(
+        f"{ITEM_SELECT} WHERE {' AND '.join(clauses)} ORDER BY a.due IS NULL, a.due, a.id LIMIT ? OFFSET ?",
+        (*params, limit + 1, offset),
+    )
+    next_offset = offset + limit if len(rows) > limit else None
+    return [_item(r) for r in rows[:limit]], next_offset
+
+
+def update_action_item(db: Database, user_id: str, item_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Apply `changes` (a subset of EDITABLE_FIELDS) to an owned item; None if it is not the user's."""
+    fields = [f for f in EDITABLE_FIELDS if f in changes]
+    with db.transaction() as cur:
+        if fields:
+            assignments = ", ".join(f"{f} = ?" for f in fields)
+            cur.execute(
+                f"UPDATE action_items SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND user_id = ?",
+                (*(changes[f] for f in fields), item_id, user_id),
+            )
+        row = cur.execute(f"{ITEM_SELECT} WHERE a.id = ? AND a.user_id = ?", (item_id, user_id)).fetchone()
+    return _item(row) if row else None
@@ -0,0 +1,323 @@
+# analysis.py – Prompting, parsing and map-reduce analysis of transcripts
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import ERRORS, stage
+
+log = logging.getLogger(__name__)
+
+# Bump PROMPT_VERSION whenever the prompts below change so cached analyses are not reused.
+PROMPT_VERSION = "1"
+ANALYZE_PROMPT = """
+You are a JSON-only meeting summarizer. Return only JSON in this schema:
+{{
+  "summary": ["point1", "point2"],
+  "action_items": [{{"assignee": null, "task": "example", "due": null, "context": ""}}],
+  "decisions": ["decision1"],
+  "sentiment": {{"sentiment": "neutral", "score": 0.0}}
+}}
+Transcript: {transcript}
+"""
+CHUNK_PROMPT = """
+You are a JSON-only meeting summarizer. The text below is part {index} of {total} of a longer
+meeting transcript. Extract only what is said in this part. Return only JSON in this schema:
+{{
+  "summary": ["point1", "point2"],
+  "action_items": [{{"assignee": null, "task": "example", "due": null, "context": ""}}],
+  "decisions": ["decision1"],
+  "sentiment": {{"sentiment": "neutral", "score": 0.0}}
+}}
+Transcript part: {transcript}
+"""
+REDUCE_PROMPT = """
+You are a JSON-only meeting summarizer. The JSON below was extracted from consecutive parts of
+one meeting. Merge it into a single analysis of the whole meeting: combine overlapping summary
+points, remove duplicate action items and decisions, and keep every distinct commitment.
+Return only JSON in this schema:
+{{
+  "summary": ["point1", "point2"],
+  "action_items": [{{"assignee": null, "task": "example", "due": null, "context": ""}}],
+  "decisions": ["decision1"],
+  "sentiment": {{"sentiment": "neutral", "score": 0.0}}
+}}
+Partial analyses: {partials}
+"""
+
+class AnalysisFormatError(ValueError):
+    """The model kept replying with something that is not analysis JSON."""
+
+
+SPEAKER_LINE = re.compile(r"^\s*(\[[^\]]{1,20}\]\s*)?[A-Za-z][\w .'-]{0,40}:\s")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def parse_analysis(raw: str) -> Dict[str, Any]:
+    """Strip Markdown fences from a model reply and decode the JSON object."""
+    cleaned = re.sub(r"```json|```", "", raw or "").strip()
+    data = json.loads(cleaned)
+    if not isinstance(data, dict):
+        raise ValueError("Analysis JSON is not an object.")
+    return data
+
+
+def analysis_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """The four `AnalyzeResponse` sections of a parsed reply, with defaults."""
+    return {
+        "summary": data.get("summary", []),
+        "action_items": data.get("action_items", []),
+        "decisions": data.get("decisions", []),
+        "sentiment": data.get("sentiment", {"sentiment": "neutral", "score": 0.0}),
+    }
+
+
+def analysis_events(fields: Dict[str, Any]) -> List[tuple]:
+    """`(event, value)` pairs for a finished analysis, in streaming-event order."""
+    events = [("summary", s) for s in fields["summary"]]
+    events += [("action_item", a) for a in fields["action_items"]]
+    events += [("decision", d) for d in fields["decisions"]]
+    events.append(("sentiment", fields["sentiment"]))
+    return events
+
+
+# -------------------------
+# Chunking
+# -------------------------
+def _speaker_turns(paragraph: str) -> List[str]:
+    turns: List[List[str]] = []
+    for line in paragraph.split("\n"):
+        if not turns or SPEAKER_LINE.match(line):
+            turns.append([line])
+        else:
+            turns[-1].append(line)
+    return ["\n".join(t) for t in turns]
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    pieces, current = [], ""
+    for sentence in SENTENCE_END.split(text):
+        while estimate_tokens(sentence) > max_tokens:
+            cut = max_tokens * 4
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:]
+        if current and estimate_tokens(current + " " + sentence) > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _units(transcript: str, max_tokens: int) -> List[str]:
+    units: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", transcript):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append(paragraph)
+            continue
+        for turn in _speaker_turns(paragraph):
+            if estimate_tokens(turn) <= max_tokens:
+                units.append(turn)
+            else:
+                units.extend(_hard_split(turn, max_tokens))
+    return units
+
+
+def split_transcript(transcript: str, max_tokens: int) -> List[str]:
+    """Pack paragraphs / speaker turns into windows of at most `max_tokens`."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for unit in _units(transcript, max_tokens):
+        unit_tokens = estimate_tokens(unit)
+        if current and size + unit_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += unit_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+# -------------------------
+# Reduce
+# -------------------------
+def _norm(text: Any) -> str:
+    return re.sub(r"\W+", " ", str(text or "").lower()).strip()
+
+
+def _dedupe(items: List[Any]) -> List[Any]:
+    seen, out = set(), []
+    for item in items:
+        key = _norm(item)
+        if key and key not in seen:
+            seen.add(key)
+            out.append(item)
+    return out
+
+
+def model_label(models: Iterable[str]) -> str:
+    """One name for the set of models that produced an analysis, e.g. "a+b"."""
+    return "+".join(sorted(set(models)))
+
+
+def sentiment_label(score: float) -> str:
+    if score >= 0.25:
+        return "positive"
+    if score <= -0.25:
+        return "negative"
+    return "neutral"
+
+
+def merge_partials(partials: List[Dict[str, Any]], weights: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Deterministically merge chunk analyses into one `AnalyzeResponse`-shaped dict."""
+    weights = weights or [1] * len(partials)
+    summary: List[str] = []
+    decisions: List[str] = []
+    actions: Dict[tuple, Dict[str, Any]] = {}
+    score_sum, weight_sum = 0.0, 0
+    for part, weight in zip(partials, weights):
+        summary.extend(s for s in part.get("summary", []) if isinstance(s, str))
+        decisions.extend(d for d in part.get("decisions", []) if isinstance(d, str))
+        for item in part.get("action_items", []):
+            if not isinstance(item, dict) or not item.get("task"):
+                continue
+            key = (_norm(item.get("task")), _norm(item.get("assignee")))
+            if key in actions:
+                merged = actions[key]
+                for field in ("due", "context"):
+                    if not merged.get(field) and item.get(field):
+                        merged[field] = item[field]
+            else:
+                actions[key] = dict(item)
+        try:
+            score_sum += float(part.get("sentiment", {}).get("score", 0.0)) * weight
+            weight_sum += weight
+        except (TypeError, ValueError, AttributeError):
+            pass
+    score = round(score_sum / weight_sum, 3) if weight_sum else 0.0
+    return {
+        "summary": _dedupe(summary),
+        "action_items": list(actions.values()),
+        "decisions": _dedupe(decisions),
+        "sentiment": {"sentiment": sentiment_label(score), "score": score},
+    }
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+class AnalysisPipeline:
+    """Single Gemini call for short transcripts, map-reduce for long ones.
+
+    `generate` is an async `prompt -> (text, model)` callable, and `run`
+    returns the analysis with the model that produced it (names joined by
+    "+" when map-reduce calls were answered by more than one model). A
+    single-call reply that is not valid JSON is re-requested `json_retries`
+    times before raising `AnalysisFormatError`. Chunks are summarized in parallel (at most
+    `map_concurrency` at a time); a failed chunk is retried on its own with
+    exponential backoff before the job gives up. Errors for which `is_busy`
+    is true (the LLM limiter is saturated) are waited out for up to
+    `busy_timeout` seconds without spending a chunk retry.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], Awaitable[Tuple[str, str]]],
+        single_call_tokens: int = 8000,
+        chunk_tokens: int = 6000,
+        map_concurrency: int = 4,
+        chunk_retries: int = 2,
+        retry_backoff: float = 1.0,
+        json_retries: int = 1,
+        is_busy: Callable[[Exception], bool] = lambda e: False,
+        busy_retry_delay: float = 0.5,
+        busy_timeout: float = 60.0,
+    ):
+        self.generate = generate
+        self.single_call_tokens = single_call_tokens
+        self.chunk_tokens = chunk_tokens
+        self.map_concurrency = map_concurrency
+        self.chunk_retries = chunk_retries
+        self.retry_backoff = retry_backoff
+        self.json_retries = json_retries
+        self.is_busy = is_busy
+        self.busy_retry_delay = busy_retry_delay
+        self.busy_timeout = busy_timeout
+
+    async def run(self, transcript: str) -> Tuple[Dict[str, Any], str]:
+        if estimate_tokens(transcript) <= self.single_call_tokens:
+            with stage("prompt"):
+                prompt = ANALYZE_PROMPT.format(transcript=transcript)
+            for attempt in range(self.json_retries + 1):
+                raw, model = await self.generate(prompt)
+                try:
+                    with stage("parse"):
+                        return parse_analysis(raw), model
+                except ValueError as e:
+                    ERRORS.inc(component="analysis", kind="malformed_json")
+                    log.warning("Malformed analysis JSON", extra={"attempt": attempt + 1, "error": str(e)})
+            raise AnalysisFormatError("Gemini returned malformed analysis JSON.")
+        return await self._map_reduce(split_transcript(transcript, self.chunk_tokens))
+
+    async def _summarize_chunk(
+        self, semaphore: asyncio.Semaphore, index: int, total: int, chunk: str
+    ) -> Tuple[Dict[str, Any], str]:
+        with stage("prompt"):
+            prompt = CHUNK_PROMPT.format(index=index + 1, total=total, transcript=chunk)
+        attempt, waited = 0, 0.0
+        while True:
+            try:
+                async with semaphore:
+                    raw, model = await self.generate(prompt)
+                with stage("parse"):
+                    return parse_analysis(raw), model
+            except Exception as e:
+                if self.is_busy(e) and waited < self.busy_timeout:
+                    await asyncio.sleep(self.busy_retry_delay)
+                    waited += self.busy_retry_delay
+                    continue
+                if attempt >= self.chunk_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                log.warning(
+                    "Analysis chunk failed; retrying",
+                    extra={"chunk": index + 1, "chunks": total, "error": str(e), "retry_in_s": delay},
+                )
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _map_reduce(self, chunks: List[str]) -> Tuple[Dict[str, Any], str]:
+        log.info("Map-reduce analysis", extra={"chunks": len(chunks)})
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+        results = await asyncio.gather(
+            *(self._summarize_chunk(semaphore, i, len(chunks), c) for i, c in enumerate(chunks))
+        )
+        partials = [partial for partial, _ in results]
+        models = {model for _, model in results}
+        merged = merge_partials(partials, [estimate_tokens(c) for c in chunks])
+        try:
+            with stage("prompt"):
+                prompt = REDUCE_PROMPT.format(partials=json.dumps(merged))
+            raw, model = await self.generate(prompt)
+            with stage("parse"):
+                reduced = parse_analysis(raw)
+        except Exception as e:
+            log.warning("Reduce pass failed; using merged chunk results", extra={"error": str(e)})
+            return merged, model_label(models)
+        if not all(k in reduced for k in ("summary", "action_items", "decisions")):
+            return merged, model_label(models)
+        reduced.setdefault("sentiment", merged["sentiment"])
+        return reduced, model_label(models | {model})
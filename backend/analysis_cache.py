@@ -0,0 +1,162 @@
+# analysis_cache.py – Content-addressed cache of Gemini analyses
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from storage import Database, Migration
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Canonical form used for hashing: unified newlines, collapsed whitespace."""
+    text = transcript.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [re.sub(r"[ \t\f\v]+", " ", line).strip() for line in text.split("\n")]
+    return re.sub(r"\n{2,}", "\n\n", "\n".join(lines)).strip()
+
+
+def cache_key(transcript: str, model: str, prompt_version: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, normalize_transcript(transcript)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+CACHE_MIGRATIONS: List[Migration] = [
+    (1, "create analysis_cache", """
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            prompt_version TEXT,
+            result TEXT,
+            created_at REAL,
+            last_used_at REAL,
+            hits INTEGER DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used ON analysis_cache (last_used_at);
+        CREATE INDEX IF NOT EXISTS idx_analysis_cache_created ON analysis_cache (created_at)
+    """),
+]
+
+
+class AnalysisCache:
+    """SQLite-backed map of `cache_key -> analysis JSON` with size/age eviction.
+
+    Lookups run on the cache database's reader threads and writes on its
+    writer thread; handlers use the `aget` / `aput` / `astats` wrappers.
+    Hits are tallied in memory and written back (`last_used_at`, `hits`) at
+    most once per `hit_flush_interval` seconds, so a warm cache costs no
+    writes per request.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        max_entries: int = 10000,
+        max_age: float = 30 * 24 * 3600,
+        hit_flush_interval: float = 30.0,
+    ):
+        self.db = db
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hit_flush_interval = hit_flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._pending_hits: Dict[str, int] = {}
+        self._flushed_at = 0.0
+        self._flushes: Set["asyncio.Future[None]"] = set()
+
+    def init(self) -> None:
+        self.db.migrate(CACHE_MIGRATIONS)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        found = self.get_any([key])
+        return found[1] if found else None
+
+    def get_any(self, keys: Sequence[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(key, result) for the first of `keys` that is cached; one hit or miss either way.
+
+        Read-only: a hit is only tallied for the next `record_hits` write.
+        """
+        rows = dict(self.db.fetchall(
+            f"SELECT key, result FROM analysis_cache WHERE key IN ({', '.join('?' * len(keys))}) AND created_at >= ?",
+            (*keys, time.time() - self.max_age),
+        ))
+        key = next((k for k in keys if k in rows), None)
+        with self._lock:
+            if key is not None:
+                self.hits += 1
+                self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+            else:
+                self.misses += 1
+        return (key, json.loads(rows[key])) if key is not None else None
+
+    def record_hits(self, hits: Dict[str, int], now: float) -> None:
+        """Write tallied hits back, refreshing `last_used_at` for LRU eviction."""
+        with self.db.transaction() as cur:
+            cur.executemany(
+                "UPDATE analysis_cache SET last_used_at = ?, hits = hits + ? WHERE key = ?",
+                [(now, count, key) for key, count in hits.items()],
+            )
+
+    def _flush_hits(self) -> None:
+        now = time.time()
+        with self._lock:
+            if not self._pending_hits or now - self._flushed_at < self.hit_flush_interval:
+                return
+            hits, self._pending_hits, self._flushed_at = self._pending_hits, {}, now
+        flush = asyncio.ensure_future(self.db.write(self.record_hits, hits, now))
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flushes.discard)
+
+    def put(self, key: str, model: str, prompt_version: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        with self.db.transaction() as cur:
+            cur.execute(
+                """INSERT OR REPLACE INTO analysis_cache (key, model, prompt_version, result, created_at, last_used_at, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, 0)""",
+                (key, model, prompt_version, json.dumps(result), now, now),
+            )
+            self._evict(cur, now)
+
+    def _evict(self, cur: sqlite3.Cursor, now: float) -> None:
+        cur.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.max_age,))
+        excess = cur.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            cur.execute(
+                "DELETE FROM analysis_cache WHERE key IN "
+                "(SELECT key FROM analysis_cache ORDER BY last_used_at ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.db.fetchone("SELECT COUNT(*) FROM analysis_cache")[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        found = await self.aget_any([key])
+        return found[1] if found else None
+
+    async def aget_any(self, keys: Sequence[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        found = await self.db.read(self.get_any, keys)
+        if found is not None:
+            self._flush_hits()
+        return found
+
+    async def aput(self, key: str, model: str, prompt_version: str, result: Dict[str, Any]) -> None:
+        await self.db.write(self.put, key, model, prompt_version, result)
+
+    async def astats(self) -> Dict[str, Any]:
+        return await self.db.read(self.stats)
@@ -0,0 +1,219 @@
+# auth.py – Firebase ID token verification for Meetly.AI
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from google.auth import exceptions as google_auth_exceptions
+from google.auth import jwt
+
+FIREBASE_CERTS_URL = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+)
+FIREBASE_LOOKUP_URL = "https://identitytoolkit.googleapis.com/v1/accounts:lookup"
+FIREBASE_ISSUER_PREFIX = "https://securetoken.google.com/"
+
+# Used when the key endpoint does not send a usable Cache-Control header.
+DEFAULT_KEYS_MAX_AGE = 3600
+# Minimum gap between forced refreshes triggered by an unknown `kid`.
+MIN_FORCED_REFRESH_INTERVAL = 60
+
+
+class TokenVerificationError(Exception):
+    """Raised when an ID token is malformed, expired or not signed by Firebase."""
+
+
+def _parse_max_age(cache_control: Optional[str]) -> Optional[int]:
+    """Extract `max-age` (seconds) from a Cache-Control header value."""
+    if not cache_control:
+        return None
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else None
+
+
+# -------------------------
+# Google signing keys
+# -------------------------
+class PublicKeyCache:
+    """In-memory copy of Google's securetoken x509 certificates.
+
+    Keys are refreshed when the `max-age` advertised by the endpoint runs out,
+    or early (rate limited) when a token references a `kid` we have not seen.
+    """
+
+    def __init__(
+        self,
+        certs_url: str = FIREBASE_CERTS_URL,
+        http_get: Optional[Callable[..., Any]] = None,
+        timeout: float = 10,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.certs_url = certs_url
+        self._http_get = http_get or requests.get
+        self._timeout = timeout
+        self._clock = clock
+        self._lock = Lock()
+        self._keys: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+
+    def _fetch(self) -> None:
+        res = self._http_get(self.certs_url, timeout=self._timeout)
+        if res.status_code != 200:
+            raise TokenVerificationError(f"Could not fetch Firebase signing keys ({res.status_code})")
+        keys = res.json()
+        if not isinstance(keys, dict) or not keys:
+            raise TokenVerificationError("Firebase signing key response was empty.")
+        max_age = _parse_max_age(res.headers.get("Cache-Control"))
+        now = self._clock()
+        self._keys = keys
+        self._last_fetch = now
+        self._expires_at = now + (max_age if max_age is not None else DEFAULT_KEYS_MAX_AGE)
+
+    def get_keys(self, kid: Optional[str] = None) -> Dict[str, str]:
+        """Return the current `kid -> PEM certificate` mapping, refreshing if stale."""
+        with self._lock:
+            now = self._clock()
+            stale = now >= self._expires_at
+            unknown_kid = (
+                kid is not None
+                and kid not in self._keys
+                and now - self._last_fetch >= MIN_FORCED_REFRESH_INTERVAL
+            )
+            if stale or unknown_kid:
+                self._fetch()
+            return self._keys
+
+
+# -------------------------
+# Verified token LRU
+# -------------------------
+class VerifiedTokenCache:
+    """Bounded LRU of already verified tokens; each entry is dropped at its `exp`."""
+
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: Dict[str, Any], expires_at: float) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# -------------------------
+# Verifiers
+# -------------------------
+class FirebaseTokenVerifier:
+    """Verify Firebase ID tokens locally (RS256 signature, aud, iss, exp)."""
+
+    def __init__(
+        self,
+        project_id: str,
+        key_cache: Optional[PublicKeyCache] = None,
+        token_cache: Optional[VerifiedTokenCache] = None,
+        clock_skew: int = 10,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not project_id:
+            raise ValueError("project_id is required for local token verification.")
+        self.project_id = project_id
+        self.issuer = FIREBASE_ISSUER_PREFIX + project_id
+        self.key_cache = key_cache or PublicKeyCache(clock=clock)
+        self.token_cache = token_cache or VerifiedTokenCache(clock=clock)
+        self.clock_skew = clock_skew
+        self._clock = clock
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        try:
+            header = jwt.decode_header(token)
+        except (ValueError, google_auth_exceptions.GoogleAuthError) as e:
+            raise TokenVerificationError(f"Malformed token: {e}")
+        if header.get("alg") != "RS256":
+            raise TokenVerificationError("Unexpected token algorithm.")
+        kid = header.get("kid")
+        if not kid:
+            raise TokenVerificationError("Token has no key id.")
+
+        certs = self.key_cache.get_keys(kid)
+        if kid not in certs:
+            raise TokenVerificationError("Token signed with an unknown key.")
+        try:
+            claims = jwt.decode(
+                token,
+                certs={kid: certs[kid]},
+                audience=self.project_id,
+                clock_skew_in_seconds=self.clock_skew,
+            )
+        except (ValueError, google_auth_exceptions.GoogleAuthError) as e:
+            raise TokenVerificationError(str(e))
+
+        if claims.get("iss") != self.issuer:
+            raise TokenVerificationError("Token has an unexpected issuer.")
+        uid = claims.get("sub")
+        if not uid or not isinstance(uid, str):
+            raise TokenVerificationError("Token has no subject.")
+        if claims.get("auth_time", 0) > self._clock() + self.clock_skew:
+            raise TokenVerificationError("Token auth_time is in the future.")
+
+        user = {
+            "uid": uid,
+            "email": claims.get("email", ""),
+            "name": claims.get("name", ""),
+        }
+        self.token_cache.put(token, user, float(claims["exp"]))
+        return user
+
+
+class FirebaseRestVerifier:
+    """Fallback verifier: one `accounts:lookup` round-trip per token."""
+
+    def __init__(self, api_key: str, timeout: float = 10, lookup_url: str = FIREBASE_LOOKUP_URL):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.lookup_url = lookup_url
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        res = requests.post(
+            f"{self.lookup_url}?key={self.api_key}",
+            json={"idToken": token},
+            timeout=self.timeout,
+        )
+        if res.status_code != 200:
+            raise TokenVerificationError("Token verification failed")
+        data = res.json()
+        if "users" not in data:
+            raise TokenVerificationError("Unauthorized user")
+        user = data["users"][0]
+        return {
+            "uid": user["localId"],
+            "email": user.get("email", ""),
+            "name": user.get("displayName", ""),
+        }
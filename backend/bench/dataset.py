@@ -0,0 +1,124 @@
+# bench/dataset.py – Synthetic meetings.db at fixed scales
+#
+#   cd backend && python -m bench.dataset --scale medium --out /tmp/meetly-bench/medium.db
+#
+# Meetings are spread over users and the last `days` days, with realistic
+# transcripts, summaries, action items and share tokens, and are inserted
+# through the normal triggers so search, stats rollups and action items are
+# populated too. The same scale and seed always produce the same rows.
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List, NamedTuple
+
+from bench.fakes import WORDS
+from storage import MIGRATIONS, Database
+
+
+class Scale(NamedTuple):
+    meetings: int
+    users: int
+    transcript_lines: int  # average; actual is 0.25x–1.75x
+
+
+SCALES: Dict[str, Scale] = {
+    "tiny": Scale(200, 5, 40),
+    "small": Scale(2_000, 50, 60),
+    "medium": Scale(20_000, 500, 60),
+    "large": Scale(100_000, 2_000, 40),
+}
+SPEAKERS = ["Alice", "Bob", "Carol", "Dan", "Erin", "Frank"]
+SHARED_EVERY = 10  # every 10th meeting has a share token
+# Fixed "now" so the same seed gives the same dates; rows land in the `days` days before it.
+END = 1_760_000_000.0
+INSERT_SQL = """INSERT INTO meetings (user_id, user_email, title, date, transcript, summary, summary_preview,
+                                      action_items, decisions, sentiment, share_token, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def user_id(i: int) -> str:
+    return f"user{i}"
+
+
+def share_token(meeting_index: int) -> str:
+    return f"share-{meeting_index:08d}"
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def transcript(rng: random.Random, lines: int) -> str:
+    return "\n".join(
+        f"{rng.choice(SPEAKERS)}: {sentence(rng, rng.randint(6, 18))}."
+        for _ in range(max(2, int(lines * rng.uniform(0.25, 1.75))))
+    )
+
+
+def meeting(rng: random.Random, i: int, scale: Scale, now: float, days: int) -> tuple:
+    uid = user_id(rng.randrange(scale.users))
+    created = now - rng.uniform(0, days * 86400)
+    summary = [sentence(rng, 10).capitalize() + "." for _ in range(rng.randint(3, 6))]
+    actions = [
+        {
+            "assignee": rng.choice(SPEAKERS + [None]),
+            "task": sentence(rng, 6).capitalize(),
+            "due": time.strftime("%Y-%m-%d", time.gmtime(created + rng.randint(1, 14) * 86400)) if rng.random() < 0.5 else None,
+        }
+        for _ in range(rng.randint(0, 5))
+    ]
+    label = rng.choice(["positive", "neutral", "negative"])
+    score = {"positive": 0.6, "neutral": 0.0, "negative": -0.5}[label]
+    return (
+        uid, f"{uid}@meetly.ai", f"{sentence(rng, 3).title()} sync", time.strftime("%Y-%m-%d", time.gmtime(created)),
+        transcript(rng, scale.transcript_lines), json.dumps(summary), json.dumps(summary[:2]), json.dumps(actions),
+        json.dumps([sentence(rng, 6).capitalize()] if rng.random() < 0.7 else []),
+        json.dumps({"sentiment": label, "score": score}),
+        share_token(i) if i % SHARED_EVERY == 0 else None,
+        time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(created)),
+    )
+
+
+def build_db(path: str, scale: str, seed: int = 0, days: int = 90, batch: int = 5000) -> Dict[str, int]:
+    """Create `path` at `scale` unless it already exists; returns row counts."""
+    if not os.path.exists(path):
+        spec = SCALES[scale]
+        rng = random.Random(seed)
+        tmp = path + ".partial"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        db = Database(tmp)
+        db.migrate(MIGRATIONS)
+        for start in range(0, spec.meetings, batch):
+            rows = [meeting(rng, i, spec, END, days) for i in range(start, min(start + batch, spec.meetings))]
+            with db.transaction() as cur:
+                cur.executemany(INSERT_SQL, rows)
+        db.close()
+        os.replace(tmp, path)
+    db = Database(path, readers=1)
+    try:
+        return {
+            table: db.fetchone(f"SELECT COUNT(*) FROM {table}")[0]
+            for table in ("meetings", "action_items", "meeting_stats_daily")
+        }
+    finally:
+        db.close()
+
+
+def shared_tokens(scale: str, limit: int) -> List[str]:
+    count = SCALES[scale].meetings
+    return [share_token(i) for i in range(0, count, SHARED_EVERY)][:limit]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    started = time.perf_counter()
+    counts = build_db(args.out, args.scale, args.seed)
+    print(json.dumps({"scale": args.scale, "path": args.out, **counts, "seconds": round(time.perf_counter() - started, 1)}))
@@ -0,0 +1,203 @@
+# bench/db_stress.py – Concurrent read/write stress: per-call connections vs. the pooled WAL layer
+#
+#   cd backend && python -m bench.db_stress --clients 16 --ops 4000 --write-ratio 0.2 --rows 20000
+#
+# `--clients` coroutines share `--ops` operations (list a user's meetings,
+# fetch one meeting, or insert one) against a `--rows` meetings database.
+# "per_call" is the old handler pattern: a fresh sqlite3.connect() in
+# rollback-journal mode for every call, run directly inside the async
+# handler. "pooled" goes through storage.Database (WAL, long-lived
+# connections, reads on the reader pool, writes on the writer thread). A
+# ticker measures event-loop lag while each run is in progress.
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from storage import MIGRATIONS, Database
+
+LIST_SQL = ("SELECT id, title, date, summary_preview, created_at FROM meetings "
+            "WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 50")
+GET_SQL = ("SELECT id, title, date, transcript, summary, decisions, sentiment, created_at "
+           "FROM meetings WHERE id = ? AND user_id = ?")
+INSERT_SQL = ("INSERT INTO meetings (user_id, user_email, title, date, transcript, summary, summary_preview, "
+              "action_items, decisions, sentiment, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+TRANSCRIPT = "Alice: let's review the launch checklist and owners for next week.\n" * 40
+
+
+def row(i: int, users: int) -> tuple:
+    summary = json.dumps(["Reviewed roadmap", "Agreed on launch date", "Assigned follow-ups"])
+    return (
+        f"user{i % users}", f"user{i % users}@meetly.ai", f"Meeting {i}", "2025-01-01", TRANSCRIPT,
+        summary, json.dumps(json.loads(summary)[:2]),
+        json.dumps([{"assignee": "Alice", "task": "Send notes", "due": None}]), "[]",
+        json.dumps({"sentiment": "neutral", "score": 0.0}),
+        time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_600_000_000 + i * 60)),
+    )
+
+
+def build_db(path: str, rows: int, users: int) -> None:
+    if os.path.exists(path):
+        return
+    db = Database(path)
+    db.migrate(MIGRATIONS)
+    with db.transaction() as cur:
+        cur.executemany(INSERT_SQL, [row(i, users) for i in range(rows)])
+    db.close()
+
+
+# -------------------------
+# The two access patterns
+# -------------------------
+class PerCallStore:
+    """Open, use and close a connection per call, on the event loop (the old handlers)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        con = sqlite3.connect(path)
+        con.execute("PRAGMA journal_mode=DELETE")
+        con.close()
+
+    async def read(self, sql: str, params: tuple) -> List[tuple]:
+        con = sqlite3.connect(self.path)
+        try:
+            return con.execute(sql, params).fetchall()
+        finally:
+            con.close()
+
+    async def write(self, sql: str, params: tuple) -> None:
+        con = sqlite3.connect(self.path)
+        try:
+            con.execute(sql, params)
+            con.commit()
+        finally:
+            con.close()
+
+    def close(self) -> None:
+        pass
+
+
+class PooledStore:
+    def __init__(self, path: str):
+        self.db = Database(path)
+
+    async def read(self, sql: str, params: tuple) -> List[tuple]:
+        return await self.db.read(self.db.fetchall, sql, params)
+
+    async def write(self, sql: str, params: tuple) -> None:
+        await self.db.write(self.db.execute, sql, params)
+
+    def close(self) -> None:
+        self.db.close()
+
+
+# -------------------------
+# Driver
+# -------------------------
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples) or [0.0]
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+
+
+async def drive(store: Any, args, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    plan = ["write" if rng.random() < args.write_ratio else rng.choice(["list", "get"]) for _ in range(args.ops)]
+    latencies: Dict[str, List[float]] = {"list": [], "get": [], "write": []}
+    errors = 0
+    next_id = args.rows
+
+    async def one(kind: str) -> None:
+        nonlocal next_id, errors
+        uid = rng.randrange(args.users)
+        start = time.perf_counter()
+        try:
+            if kind == "list":
+                await store.read(LIST_SQL, (f"user{uid}",))
+            elif kind == "get":
+                meeting_id = rng.randrange(1, args.rows + 1)
+                await store.read(GET_SQL, (meeting_id, f"user{(meeting_id - 1) % args.users}"))
+            else:
+                next_id += 1
+                await store.write(INSERT_SQL, row(next_id, args.users))
+        except sqlite3.OperationalError:
+            errors += 1
+        latencies[kind].append((time.perf_counter() - start) * 1000)
+
+    queue = iter(plan)
+
+    async def client() -> None:
+        for kind in queue:
+            await one(kind)
+            await asyncio.sleep(0)
+
+    lag: List[float] = []
+    done = asyncio.Event()
+
+    async def ticker(interval: float = 0.005) -> None:
+        while not done.is_set():
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lag.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+    watcher = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    seconds = time.perf_counter() - start
+    done.set()
+    await watcher
+    every = [s for samples in latencies.values() for s in samples]
+    return {
+        "ops_per_s": round(args.ops / seconds, 1),
+        "seconds": round(seconds, 2),
+        "errors": errors,
+        "p50_ms": percentile(every, 0.5),
+        "p99_ms": percentile(every, 0.99),
+        "by_kind_p99_ms": {k: percentile(v, 0.99) for k, v in latencies.items() if v},
+        "loop_lag_p99_ms": percentile(lag, 0.99),
+        "loop_blocked_s": round(sum(lag) / 1000, 2),
+    }
+
+
+async def bench(args) -> Dict[str, Any]:
+    template = os.path.join(args.dir, f"stress_{args.rows}.db")
+    build_db(template, args.rows, args.users)
+    scratch = tempfile.mkdtemp(prefix="meetly-stress-")
+    results = {}
+    for name, factory in (("per_call", PerCallStore), ("pooled", PooledStore)):
+        runs = []
+        for repeat in range(args.repeat):
+            path = os.path.join(scratch, f"{name}-{repeat}.db")
+            shutil.copyfile(template, path)
+            store = factory(path)
+            try:
+                runs.append(await drive(store, args, args.seed + repeat))
+            finally:
+                store.close()
+        results[name] = runs[0] if len(runs) == 1 else {
+            k: statistics.median(r[k] for r in runs) if isinstance(runs[0][k], (int, float)) else runs[0][k]
+            for k in runs[0]
+        }
+    shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=4000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=1, help="median of N runs per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", default=os.path.join(tempfile.gettempdir(), "meetly-bench"))
+    args = parser.parse_args()
+    os.makedirs(args.dir, exist_ok=True)
+    print(json.dumps({"args": vars(args), **asyncio.run(bench(args))}, indent=2))
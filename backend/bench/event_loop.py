@@ -0,0 +1,110 @@
+# bench/event_loop.py – Meeting reads stay fast while slow analyses are in flight
+#
+#   cd backend && python -m bench.event_loop --analyses 4 --gemini-latency-ms 3000 --reads 400
+#
+# Drives GET /api/v1/meetings and GET /api/v1/meetings/{id} through the app in
+# process, first with nothing else running and then while `--analyses` POST
+# /api/v1/analyze calls are held open by a fake Gemini that takes
+# `--gemini-latency-ms` per call. Gemini calls run on executor threads behind
+# the limiter, so read latency should barely move; a blocking call on the
+# event loop would push every read behind it. Prints both runs as JSON and
+# exits with status 1 if the busy p99 exceeds --max-p99-ms or no analysis was
+# actually in flight during the busy run.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from bench import dataset
+from bench.fakes import install_fake_gemini
+from bench.load import AsgiClient, Workload, configure, get_meeting, list_meetings, percentile
+
+
+async def reads(w: Workload, count: int) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {}
+    for i in range(count):
+        t = time.perf_counter()
+        route, status = await (list_meetings if i % 2 else get_meeting)(w)
+        if status != 200:
+            raise RuntimeError(f"{route} returned {status}")
+        samples.setdefault(route, []).append((time.perf_counter() - t) * 1000)
+    return {
+        route: {"p50_ms": percentile(sorted(s), 0.5), "p99_ms": percentile(sorted(s), 0.99), "max_ms": round(max(s), 3)}
+        for route, s in sorted(samples.items())
+    }
+
+
+async def bench(args) -> Dict[str, Any]:
+    import main
+
+    install_fake_gemini(main.llm_clients, args.gemini_latency_ms / 1000, jitter=0.0)
+    await main.startup_event()
+    try:
+        w = Workload(AsgiClient(main.app), main.db, args.scale, random.Random(args.seed))
+        idle = await reads(w, args.reads)
+
+        stop = asyncio.Event()
+        completed, peak = 0, 0
+
+        async def analyze_forever(n: int) -> None:
+            nonlocal completed
+            uid = w.users[n % len(w.users)]
+            while not stop.is_set():
+                body = {"transcript": dataset.transcript(random.Random(), 40), "title": "Event loop bench"}
+                status, _, _ = await w.client.request("POST", "/api/v1/analyze", w.auth(uid), body)
+                if status != 200:
+                    raise RuntimeError(f"POST /api/v1/analyze returned {status}")
+                completed += 1
+
+        async def watch() -> None:
+            nonlocal peak
+            while not stop.is_set():
+                peak = max(peak, sum(c.in_flight for c in main.llm_clients))
+                await asyncio.sleep(0.01)
+
+        background = [asyncio.create_task(analyze_forever(n)) for n in range(args.analyses)] + [
+            asyncio.create_task(watch())
+        ]
+        await asyncio.sleep(0.2)  # let the analyses reach the model
+        busy = await reads(w, args.reads)
+        stop.set()
+        await asyncio.gather(*background)
+    finally:
+        await main.shutdown_event()
+    return {"idle": idle, "busy": busy, "analyses_completed": completed, "peak_llm_in_flight": peak}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(dataset.SCALES), default="tiny")
+    parser.add_argument("--analyses", type=int, default=4, help="analyze requests kept in flight")
+    parser.add_argument("--reads", type=int, default=400, help="reads timed per run")
+    parser.add_argument("--gemini-latency-ms", type=float, default=3000)
+    parser.add_argument("--max-p99-ms", type=float, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--firebase-latency-ms", type=float, default=0)
+    parser.add_argument("--firebase-verify", choices=["local", "rest"], default="local")
+    parser.add_argument("--sendgrid-latency-ms", type=float, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "meetly-bench"))
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    db_path = os.path.join(args.data_dir, f"{args.scale}-seed{args.seed}.db")
+    dataset.build_db(db_path, args.scale, args.seed)
+    os.environ.update(LLM_MAX_CONCURRENCY=str(args.analyses), LLM_HEDGING="false")
+    configure(args, tempfile.mkdtemp(prefix="meetly-loop-"), db_path)
+    results = asyncio.run(bench(args))
+
+    worst = max(stats["p99_ms"] for stats in results["busy"].values())
+    failures = []
+    if worst > args.max_p99_ms:
+        failures.append(f"busy read p99 {worst} ms > {args.max_p99_ms} ms")
+    if results["peak_llm_in_flight"] < args.analyses:
+        failures.append(f"only {results['peak_llm_in_flight']} of {args.analyses} analyses reached the model")
+    print(json.dumps({**results, "failures": failures}, indent=2))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,108 @@
+# bench/fake_llm.py – Scripted stand-in for genai.GenerativeModel
+#
+# Plug it into a GeminiClient to replay slow, failing or garbage replies:
+#
+#   client = GeminiClient("fake", model_factory=lambda name: ScriptedModel([slow(3), ok()]))
+#   client = GeminiClient("fake", model_factory=lambda name: ScriptedModel(random_script(p_slow=0.05)))
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Sequence, Union
+
+VALID_REPLY = json.dumps({
+    "summary": ["Team reviewed the launch checklist."],
+    "action_items": [{"assignee": "Alice", "task": "Send the release notes", "due": None}],
+    "decisions": ["Ship on Monday"],
+    "sentiment": {"sentiment": "positive", "score": 0.6},
+})
+
+
+@dataclass(frozen=True)
+class Step:
+    kind: str  # "ok" | "error" | "garbage"
+    delay: float = 0.0
+    text: str = VALID_REPLY
+
+
+def ok(delay: float = 0.0, text: str = VALID_REPLY) -> Step:
+    return Step("ok", delay, text)
+
+
+def slow(delay: float, text: str = VALID_REPLY) -> Step:
+    return Step("ok", delay, text)
+
+
+def error(message: str = "500 Internal error", delay: float = 0.0) -> Step:
+    return Step("error", delay, message)
+
+
+def garbage(delay: float = 0.0, text: str = "Sure! Here is the analysis you asked for:") -> Step:
+    return Step("garbage", delay, text)
+
+
+def random_script(
+    p_slow: float = 0.0,
+    p_error: float = 0.0,
+    p_garbage: float = 0.0,
+    delay: float = 0.05,
+    slow_delay: float = 2.0,
+    seed: int = 0,
+) -> Callable[[int, str], Step]:
+    """Steps drawn at random with the given probabilities (reproducible per seed)."""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def step(n: int, prompt: str) -> Step:
+        with lock:
+            r = rng.random()
+            jitter = rng.uniform(0.8, 1.2)
+        if r < p_error:
+            return error(delay=delay * jitter)
+        if r < p_error + p_garbage:
+            return garbage(delay * jitter)
+        if r < p_error + p_garbage + p_slow:
+            return slow(slow_delay * jitter)
+        return ok(delay * jitter)
+
+    return step
+
+
+class _Reply:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ScriptedModel:
+    """`generate_content` replays `script`: a list of Steps (the last one repeats)
+    or a `(call_number, prompt) -> Step` function. Calls run on executor threads."""
+
+    def __init__(self, script: Union[Sequence[Step], Callable[[int, str], Step]]):
+        self.script = script
+        self.prompts: List[str] = []
+        self._lock = threading.Lock()
+
+    def _next(self, prompt: str) -> Step:
+        with self._lock:
+            n = len(self.prompts)
+            self.prompts.append(prompt)
+        if callable(self.script):
+            return self.script(n, prompt)
+        return self.script[min(n, len(self.script) - 1)]
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        step = self._next(prompt)
+        if step.kind == "error":
+            time.sleep(step.delay)
+            raise RuntimeError(step.text)
+        if stream:
+            return self._stream(step)
+        time.sleep(step.delay)
+        return _Reply(step.text)
+
+    def _stream(self, step: Step) -> Iterator[_Reply]:
+        pieces = [step.text[i:i + 40] for i in range(0, len(step.text), 40)] or [""]
+        for piece in pieces:
+            time.sleep(step.delay / len(pieces))
+            yield _Reply(piece)
@@ -0,0 +1,157 @@
+# bench/fakes.py – Local stand-ins for Gemini, Firebase token verification and SendGrid
+#
+# `start_fake_services()` serves SendGrid's v3 mail/send, Google's x509
+# securetoken certs (GET /certs) and Firebase's accounts:lookup on a loopback
+# port; point SENDGRID_API_URL, FIREBASE_CERTS_URL and FIREBASE_LOOKUP_URL at
+# it before importing main. Bench ID tokens are real RS256 Firebase-shaped
+# JWTs for project bench.firebase_tokens.PROJECT_ID, signed with a key whose
+# certificate /certs publishes, so FIREBASE_VERIFY_MODE=local runs the same
+# signature and claim checks as production; the lookup endpoint accepts them
+# too. Gemini runs in process: `install_fake_gemini(main.llm_clients, ...)`
+# swaps each client's model for a ScriptedModel.
+import functools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional
+
+from google.auth import jwt
+
+from bench.fake_llm import ScriptedModel, ok
+from bench.firebase_tokens import SigningKey, sign_token
+
+CERTS_MAX_AGE = 3600
+
+
+@functools.lru_cache(maxsize=None)
+def signing_key() -> SigningKey:
+    return SigningKey("bench-key")
+
+
+@functools.lru_cache(maxsize=None)
+def bench_token(uid: str) -> str:
+    """A signed ID token for `uid`, minted once per uid so signing stays out of the timings."""
+    return sign_token(signing_key(), uid)
+
+
+class FakeServices(BaseHTTPRequestHandler):
+    """Sleeps the configured delay per request, then answers like the real API."""
+
+    protocol_version = "HTTP/1.1"
+    sendgrid_delay = 0.0
+    firebase_delay = 0.0
+    calls = 0
+    delivered = 0
+    lookups = 0
+    cert_fetches = 0
+    codes: Dict[str, str] = {}  # last OTP mailed to each address
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path.startswith("/certs"):
+            time.sleep(self.firebase_delay)
+            with self.lock:
+                FakeServices.cert_fetches += 1
+            key = signing_key()
+            self._reply(200, {key.kid: key.cert_pem}, {"Cache-Control": f"public, max-age={CERTS_MAX_AGE}"})
+        else:
+            self._reply(404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.startswith("/v3/mail/send"):
+            time.sleep(self.sendgrid_delay)
+            with self.lock:
+                FakeServices.calls += 1
+                FakeServices.delivered += len(body.get("personalizations", []))
+                for p in body.get("personalizations", []):
+                    if "-code-" in p.get("substitutions", {}):
+                        FakeServices.codes[p["to"][0]["email"]] = p["substitutions"]["-code-"]
+            self._reply(202)
+        elif self.path.startswith("/v1/accounts:lookup"):
+            time.sleep(self.firebase_delay)
+            with self.lock:
+                FakeServices.lookups += 1
+            try:
+                claims = jwt.decode(body.get("idToken", ""), certs={signing_key().kid: signing_key().cert_pem})
+            except ValueError:
+                self._reply(400, {"error": {"message": "INVALID_ID_TOKEN"}})
+                return
+            uid = claims["user_id"]
+            self._reply(200, {"users": [{"localId": uid, "email": claims["email"], "displayName": claims["name"]}]})
+        else:
+            self._reply(404)
+
+    def _reply(self, status: int, payload=None, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The REST token verifier opens a connection per request; the default
+    # backlog of 5 drops SYNs under load and adds 1 s retransmit stalls.
+    request_queue_size = 1024
+
+
+def start_fake_services(sendgrid_delay: float = 0.0, firebase_delay: float = 0.0) -> str:
+    """Start the fake HTTP services on a daemon thread; returns their base URL."""
+    FakeServices.sendgrid_delay, FakeServices.firebase_delay = sendgrid_delay, firebase_delay
+    FakeServices.calls = FakeServices.delivered = FakeServices.lookups = FakeServices.cert_fetches = 0
+    server = _Server(("127.0.0.1", 0), FakeServices)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def analysis_reply(kb: float, seed: int = 0) -> str:
+    """Valid analysis JSON padded with summary points to about `kb` kilobytes."""
+    rng = random.Random(seed)
+    reply = {
+        "summary": [],
+        "action_items": [
+            {"assignee": f"Owner {i}", "task": f"Follow up on workstream {i}", "due": None} for i in range(4)
+        ],
+        "decisions": ["Ship the release on Monday", "Move the retro to Thursday"],
+        "sentiment": {"sentiment": "positive", "score": 0.6},
+    }
+    size = len(json.dumps(reply))
+    while size < kb * 1024:
+        point = f"Discussed item {len(reply['summary'])}: " + " ".join(
+            rng.choice(WORDS) for _ in range(12)
+        )
+        reply["summary"].append(point)
+        size += len(point) + 4
+    return json.dumps(reply)
+
+
+def install_fake_gemini(clients: Iterable, delay: float = 0.5, reply_kb: float = 2, jitter: float = 0.2, seed: int = 0) -> None:
+    """Replace every client's model with one replying after `delay` s (± jitter)."""
+    text = analysis_reply(reply_kb, seed)
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def step(n: int, prompt: str):
+        with lock:
+            factor = rng.uniform(1 - jitter, 1 + jitter)
+        return ok(delay * factor, text)
+
+    for client in clients:
+        client.model = ScriptedModel(step)
+
+
+WORDS = (
+    "launch roadmap budget hiring review customer onboarding metrics pricing design release "
+    "migration latency incident postmortem quarterly planning sprint backlog feedback demo "
+    "contract renewal partner analytics dashboard support escalation security audit"
+).split()
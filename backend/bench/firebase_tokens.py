@@ -0,0 +1,214 @@
+# bench/firebase_tokens.py – Offline checks for local Firebase ID token verification
+#
+#   cd backend && python -m bench.firebase_tokens [--runs 2000]
+#
+# Generates an RS256 keypair with a self-signed certificate, serves it from a
+# stub certs endpoint (with Cache-Control max-age) and a controllable clock,
+# and runs FirebaseTokenVerifier against valid, expired, wrong-aud, wrong-iss,
+# unknown-kid and forged tokens, plus key refresh on max-age and on rotation.
+# Prints the results and the cost of a cold and a cached verification as JSON;
+# exits with status 1 if any check fails. `SigningKey` and `sign_token` are also
+# used by bench/fakes.py to mint tokens for the load test.
+import argparse
+import datetime
+import json
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+from auth import (
+    FIREBASE_ISSUER_PREFIX,
+    MIN_FORCED_REFRESH_INTERVAL,
+    FirebaseTokenVerifier,
+    PublicKeyCache,
+    TokenVerificationError,
+    VerifiedTokenCache,
+)
+
+PROJECT_ID = "meetly-bench"
+
+
+class SigningKey:
+    """RSA private key plus the self-signed x509 certificate Google would publish for it."""
+
+    def __init__(self, kid: str):
+        self.kid = kid
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.system.gserviceaccount.com")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=30))
+            .sign(key, hashes.SHA256())
+        )
+        self.cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+        self._signer = crypt.RSASigner.from_string(self.private_pem, key_id=kid)
+
+    def sign(self, claims: Dict[str, Any]) -> str:
+        return jwt.encode(self._signer, claims).decode()
+
+
+def sign_token(key: SigningKey, uid: str, project_id: str = PROJECT_ID, ttl: int = 3600, **overrides: Any) -> str:
+    """A Firebase-shaped ID token for `uid`; `overrides` replace or add claims."""
+    now = int(time.time())
+    claims = {
+        "iss": FIREBASE_ISSUER_PREFIX + project_id,
+        "aud": project_id,
+        "auth_time": now - 60,
+        "user_id": uid,
+        "sub": uid,
+        "iat": now - 60,
+        "exp": now + ttl,
+        "email": f"{uid}@meetly.ai",
+        "name": uid,
+    }
+    claims.update(overrides)
+    return key.sign(claims)
+
+
+class StubCerts:
+    """`http_get` stand-in serving `keys` with `Cache-Control: max-age`; counts fetches."""
+
+    def __init__(self, keys: List[SigningKey], max_age: int = 300):
+        self.keys = keys
+        self.max_age = max_age
+        self.fetches = 0
+
+    def __call__(self, url: str, timeout: float = 10) -> "_Response":
+        self.fetches += 1
+        return _Response({k.kid: k.cert_pem for k in self.keys}, f"public, max-age={self.max_age}, must-revalidate")
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, payload: Dict[str, str], cache_control: str):
+        self._payload = payload
+        self.headers = {"Cache-Control": cache_control}
+
+    def json(self) -> Dict[str, str]:
+        return self._payload
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def rejects(verifier: FirebaseTokenVerifier, token: str) -> Optional[str]:
+    """The rejection reason, or None if the token was (wrongly) accepted."""
+    try:
+        verifier.verify(token)
+    except TokenVerificationError as e:
+        return str(e)
+    return None
+
+
+def run_checks() -> Dict[str, Any]:
+    current, rotated, rogue = SigningKey("key-1"), SigningKey("key-2"), SigningKey("rogue")
+    certs = StubCerts([current], max_age=300)
+    clock = Clock()
+    verifier = FirebaseTokenVerifier(
+        PROJECT_ID,
+        key_cache=PublicKeyCache(http_get=certs, clock=clock),
+        token_cache=VerifiedTokenCache(clock=clock),
+        clock=clock,
+    )
+    checks: Dict[str, Any] = {}
+
+    def check(name: str, ok: bool, detail: Any = None) -> None:
+        checks[name] = {"ok": bool(ok), "detail": detail}
+
+    user = verifier.verify(sign_token(current, "alice"))
+    check("valid", user == {"uid": "alice", "email": "alice@meetly.ai", "name": "alice"}, user)
+    check("valid_fetched_keys_once", certs.fetches == 1, certs.fetches)
+
+    reason = rejects(verifier, sign_token(current, "alice", iat=int(time.time()) - 7200, exp=int(time.time()) - 3600))
+    check("expired", reason is not None, reason)
+    reason = rejects(verifier, sign_token(current, "alice", aud="another-project"))
+    check("wrong_aud", reason is not None, reason)
+    reason = rejects(verifier, sign_token(current, "alice", iss=FIREBASE_ISSUER_PREFIX + "another-project"))
+    check("wrong_iss", reason is not None, reason)
+    reason = rejects(verifier, sign_token(current, "alice", auth_time=int(time.time()) + 3600))
+    check("future_auth_time", reason is not None, reason)
+
+    # Unknown kid: one forced refresh, then rate limited until MIN_FORCED_REFRESH_INTERVAL passes.
+    clock.now += MIN_FORCED_REFRESH_INTERVAL
+    before = certs.fetches
+    reason = rejects(verifier, sign_token(rogue, "mallory"))
+    reason_again = rejects(verifier, sign_token(rogue, "mallory", name="again"))
+    check(
+        "unknown_kid",
+        reason is not None and reason_again is not None and certs.fetches - before == 1,
+        {"reason": reason, "refreshes": certs.fetches - before},
+    )
+    # A published kid but a different private key.
+    reason = rejects(verifier, sign_token(SigningKey(current.kid), "mallory"))
+    check("bad_signature", reason is not None, reason)
+
+    # Keys are reused until max-age runs out, then fetched again.
+    fetched_at = clock.now
+    clock.now = fetched_at + certs.max_age - 1
+    before = certs.fetches
+    verifier.verify(sign_token(current, "bob"))
+    within = certs.fetches - before
+    clock.now = fetched_at + certs.max_age + 1
+    verifier.verify(sign_token(current, "carol"))
+    check("refresh_on_max_age", within == 0 and certs.fetches - before == 1, {"fetches": certs.fetches})
+
+    # Rotation: a token signed with a newly published key is accepted after a forced refresh.
+    certs.keys = [current, rotated]
+    clock.now += MIN_FORCED_REFRESH_INTERVAL
+    before = certs.fetches
+    user = verifier.verify(sign_token(rotated, "dave"))
+    check("rotated_key", user["uid"] == "dave" and certs.fetches - before == 1, {"fetches": certs.fetches})
+    return checks
+
+
+def timings(runs: int) -> Dict[str, float]:
+    key = SigningKey("key-1")
+    certs = StubCerts([key], max_age=3600)
+    verifier = FirebaseTokenVerifier(PROJECT_ID, key_cache=PublicKeyCache(http_get=certs))
+    tokens = [sign_token(key, f"user{i}") for i in range(runs)]
+
+    def per_call(fn: Callable[[str], Any]) -> float:
+        samples = []
+        for token in tokens:
+            t = time.perf_counter()
+            fn(token)
+            samples.append((time.perf_counter() - t) * 1e6)
+        return round(statistics.median(samples), 1)
+
+    return {
+        "cold_verify_p50_us": per_call(verifier.verify),
+        "cached_verify_p50_us": per_call(verifier.verify),
+        "key_fetches": certs.fetches,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+    checks = run_checks()
+    failed = [name for name, c in checks.items() if not c["ok"]]
+    print(json.dumps({"checks": checks, "timings": timings(args.runs), "failed": failed}, indent=2, default=str))
+    sys.exit(1 if failed else 0)
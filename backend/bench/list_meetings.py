@@ -0,0 +1,87 @@
+# bench/list_meetings.py – Meeting list latency vs. table size
+#
+#   cd backend && python -m bench.list_meetings --sizes 10000 100000 1000000
+#
+# Builds a synthetic meetings.db per size (cached under --dir) and times the
+# first page and a deep (cursor-paginated) page of /api/v1/meetings' query.
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+import main  # noqa: E402
+from storage import MIGRATIONS, Database  # noqa: E402
+
+
+def build_db(path: str, size: int, users: int, batch: int = 50000) -> None:
+    if os.path.exists(path):
+        return
+    db = Database(path)
+    db.migrate(MIGRATIONS)
+    summary = json.dumps(["Reviewed roadmap", "Agreed on launch date", "Assigned follow-ups"])
+    preview = json.dumps(json.loads(summary)[:2])
+    for start in range(0, size, batch):
+        rows = [
+            (
+                f"user{i % users}", f"user{i % users}@meetly.ai", f"Meeting {i}", "2025-01-01",
+                "Alice: hello\nBob: hi", summary, preview, "[]", "[]",
+                json.dumps({"sentiment": "neutral", "score": 0.0}),
+                time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_600_000_000 + i * 60)),
+            )
+            for i in range(start, min(start + batch, size))
+        ]
+        with db.transaction() as cur:
+            cur.executemany(
+                "INSERT INTO meetings (user_id, user_email, title, date, transcript, summary, summary_preview, "
+                "action_items, decisions, sentiment, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+    db.close()
+
+
+def timed(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 3), "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 3)}
+
+
+def run(size: int, users: int, directory: str, runs: int, depth: int):
+    path = os.path.join(directory, f"meetings_{size}.db")
+    build_db(path, size, users)
+    main.db = Database(path)
+    uid = "user7"
+
+    def deep_page():
+        cursor = None
+        for _ in range(depth):
+            _, next_cursor = main.list_meetings(uid, 10, cursor)
+            cursor = main.decode_cursor(next_cursor) if next_cursor else None
+
+    result = {
+        "size": size,
+        "first_page": timed(lambda: main.list_meetings(uid, 50), runs),
+        f"page_{depth}": timed(deep_page, max(1, runs // depth)),
+    }
+    main.db.close()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--dir", default=os.path.join(tempfile.gettempdir(), "meetly-bench"))
+    args = parser.parse_args()
+    os.makedirs(args.dir, exist_ok=True)
+    for size in args.sizes:
+        print(json.dumps(run(size, args.users, args.dir, args.runs, args.depth)))
@@ -0,0 +1,78 @@
+# bench/llm_router.py – Tail latency and failover of the model router against a scripted Gemini
+#
+#   cd backend && python -m bench.llm_router --calls 400 --concurrency 8
+#
+# "tail": 5% of primary calls stall; compares p50/p95/p99 with and without hedging.
+# "outage": the primary fails every call; the breaker should open and the fast
+# tier should serve the rest, with the primary probed once per reset timeout.
+import argparse
+import asyncio
+import json
+import time
+
+from bench.fake_llm import ScriptedModel, error, random_script
+from llm import GeminiClient, ModelRouter
+
+LONG_PROMPT = "Alice: let's walk through the launch plan.\n" * 400  # above the fast-tier cutoff
+
+
+def percentile(samples, q):
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))], 1)
+
+
+def client(name, script, concurrency):
+    return GeminiClient(name, max_concurrency=concurrency, queue_timeout=30, model_factory=lambda _: ScriptedModel(script))
+
+
+async def drive(router: ModelRouter, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            t = time.perf_counter()
+            try:
+                await router.generate(LONG_PROMPT)
+            except Exception:
+                failures += 1
+                return
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    latencies.sort()
+    return {
+        "ok": len(latencies),
+        "failed": failures,
+        "p50_ms": percentile(latencies, 0.5) if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) if latencies else None,
+        "wall_s": round(time.perf_counter() - start, 2),
+        "router": router.stats()["models"],
+    }
+
+
+async def bench(args):
+    results = {}
+    for hedging in (False, True):
+        primary = client("primary", random_script(p_slow=0.05, delay=0.05, slow_delay=1.5, seed=1), args.concurrency * 4)
+        router = ModelRouter([primary], hedging=hedging, hedge_min_delay=0.05, hedge_max_delay=1.0)
+        results["tail_hedged" if hedging else "tail_unhedged"] = await drive(router, args.calls, args.concurrency)
+        primary.shutdown()
+
+    primary = client("primary", [error(delay=0.02)], args.concurrency)
+    fast = client("fast", random_script(delay=0.02), args.concurrency)
+    router = ModelRouter([primary, fast], fast_tier_tokens=0, failure_threshold=5, reset_timeout=0.5)
+    results["outage"] = await drive(router, args.calls, args.concurrency)
+    results["outage"]["primary_calls"] = len(primary.model.prompts)
+    primary.shutdown()
+    fast.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    asyncio.run(bench(parser.parse_args()))
@@ -0,0 +1,430 @@
+# bench/load.py – Traffic-mix load test against the app with every external service faked
+#
+#   cd backend && python -m bench.load --scale small --mix dashboard shared analyze otp mixed \
+#       --requests 2000 --concurrency 32 --out results.json [--baseline baseline.json [--update-baseline]]
+#
+# Builds (or reuses) a synthetic meetings.db from bench/dataset.py, copies it
+# to a scratch directory, starts the fake Firebase/SendGrid services, swaps the
+# Gemini model for a fake with the configured latency and reply size, and
+# drives the ASGI app in process, so auth, middleware, serialization, SQLite
+# and the background outbox all run for real. ID tokens are signed locally and
+# verified against the fake certs endpoint (--firebase-verify rest uses the
+# fake accounts:lookup API instead). For each mix it reports
+# throughput and p50/p95/p99 per route, writes everything as JSON, and with
+# --baseline flags routes whose latency or throughput regressed beyond
+# --tolerance (exit status 1). Use --repeat on noisy machines.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bench import dataset
+from bench.fakes import FakeServices, bench_token, install_fake_gemini, start_fake_services
+from bench.firebase_tokens import PROJECT_ID
+
+Result = Tuple[str, int]  # (route label, status)
+
+
+# -------------------------
+# In-process ASGI client
+# -------------------------
+class AsgiClient:
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: Any = None,
+        client: Tuple[str, int] = ("10.0.0.1", 40000),
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        path, _, query = path.partition("?")
+        raw_headers = [(b"host", b"bench")] + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        data = b""
+        if body is not None:
+            data = json.dumps(body).encode()
+            raw_headers += [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+            "root_path": "", "headers": raw_headers, "client": client, "server": ("bench", 80),
+        }
+        finished = asyncio.Event()
+        request_sent = False
+        status, response_headers, chunks = 0, {}, []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": data, "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update((k.decode(), v.decode()) for k, v in message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    finished.set()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            finished.set()
+        return status, response_headers, b"".join(chunks)
+
+
+# -------------------------
+# Traffic
+# -------------------------
+class Workload:
+    """Dataset facts and per-run state the operations draw on."""
+
+    def __init__(self, client: AsgiClient, db: Any, scale: str, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        rows = db.fetchall("SELECT id, user_id FROM meetings ORDER BY id")
+        self.meetings: List[Tuple[int, str]] = [tuple(r) for r in rows]
+        self.users = sorted({uid for _, uid in self.meetings})
+        self.share_tokens = dataset.shared_tokens(scale, 200)
+        self.etags: Dict[str, str] = {}
+        self.cursors: Dict[str, str] = {}
+        self.repeat_transcripts = [dataset.transcript(random.Random(i), 40) for i in range(20)]
+        self.stats_from = time.strftime("%Y-%m-%d", time.gmtime(dataset.END - 30 * 86400))
+
+    def auth(self, uid: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {bench_token(uid)}"}
+
+    def hot_token(self) -> str:
+        # Zipf-like: a few links get most of the traffic, as in a burst after sharing.
+        return self.share_tokens[min(len(self.share_tokens) - 1, int(self.rng.paretovariate(1.2)) - 1)]
+
+
+async def list_meetings(w: Workload) -> Result:
+    uid = w.rng.choice(w.users)
+    path = "/api/v1/meetings?limit=20"
+    if uid in w.cursors and w.rng.random() < 0.3:
+        path += f"&after={w.cursors.pop(uid)}"
+    status, _, body = await w.client.request("GET", path, w.auth(uid))
+    if status == 200:
+        cursor = json.loads(body).get("next_cursor")
+        if cursor:
+            w.cursors[uid] = cursor
+    return "GET /api/v1/meetings", status
+
+
+async def get_meeting(w: Workload) -> Result:
+    meeting_id, uid = w.rng.choice(w.meetings)
+    status, _, _ = await w.client.request("GET", f"/api/v1/meetings/{meeting_id}", w.auth(uid))
+    return "GET /api/v1/meetings/{meeting_id}", status
+
+
+async def get_stats(w: Workload) -> Result:
+    uid = w.rng.choice(w.users)
+    status, _, _ = await w.client.request("GET", f"/api/v1/stats?from={w.stats_from}", w.auth(uid))
+    return "GET /api/v1/stats", status
+
+
+async def list_action_items(w: Workload) -> Result:
+    uid = w.rng.choice(w.users)
+    status, _, _ = await w.client.request("GET", "/api/v1/action-items?status=open&limit=50", w.auth(uid))
+    return "GET /api/v1/action-items", status
+
+
+async def search(w: Workload) -> Result:
+    uid = w.rng.choice(w.users)
+    q = " ".join(w.rng.sample(dataset.WORDS, 2))
+    status, _, _ = await w.client.request("GET", f"/api/v1/meetings/search?q={q.replace(' ', '+')}", w.auth(uid))
+    return "GET /api/v1/meetings/search", status
+
+
+async def shared_link(w: Workload) -> Result:
+    token = w.hot_token()
+    headers = {"Accept-Encoding": "gzip"} if w.rng.random() < 0.7 else {}
+    if token in w.etags and w.rng.random() < 0.3:
+        headers["If-None-Match"] = w.etags[token]
+    status, response_headers, _ = await w.client.request("GET", f"/api/v1/shared/{token}", headers)
+    if "etag" in response_headers:
+        w.etags[token] = response_headers["etag"]
+    return "GET /api/v1/shared/{token}", status
+
+
+async def analyze(w: Workload) -> Result:
+    uid = w.rng.choice(w.users)
+    if w.rng.random() < 0.2:
+        transcript = w.rng.choice(w.repeat_transcripts)
+    else:
+        transcript = dataset.transcript(random.Random(w.rng.random()), 60)
+    body = {"transcript": transcript, "title": "Load test", "date": "2025-10-01"}
+    status, _, _ = await w.client.request("POST", "/api/v1/analyze", w.auth(uid), body)
+    return "POST /api/v1/analyze", status
+
+
+async def analyze_batch(w: Workload) -> Result:
+    uid = w.rng.choice(w.users)
+    items = [{"transcript": dataset.transcript(random.Random(w.rng.random()), 30)} for _ in range(3)]
+    status, _, _ = await w.client.request("POST", "/api/v1/analyze/batch", w.auth(uid), {"items": items})
+    return "POST /api/v1/analyze/batch", status
+
+
+async def send_otp(w: Workload) -> Result:
+    n = w.rng.randrange(5000)
+    status, _, _ = await w.client.request(
+        "POST", "/api/v1/send_otp", body={"email": f"load{n}@meetly.ai"}, client=(f"10.1.{n % 250}.{n % 7}", 40000)
+    )
+    return "POST /api/v1/send_otp", status
+
+
+async def verify_otp(w: Workload) -> Result:
+    email = w.rng.choice(list(FakeServices.codes)) if FakeServices.codes else "load0@meetly.ai"
+    code = FakeServices.codes.get(email, "000000")
+    status, _, _ = await w.client.request("POST", "/api/v1/verify_otp", body={"email": email, "otp": code})
+    return "POST /api/v1/verify_otp", status
+
+
+Operation = Callable[[Workload], Awaitable[Result]]
+MIXES: Dict[str, List[Tuple[Operation, int]]] = {
+    "dashboard": [(list_meetings, 40), (get_stats, 25), (get_meeting, 20), (list_action_items, 10), (search, 5)],
+    "shared": [(shared_link, 1)],
+    "analyze": [(analyze, 9), (analyze_batch, 1)],
+    "otp": [(send_otp, 2), (verify_otp, 1)],
+    "mixed": [
+        (list_meetings, 20), (get_stats, 12), (get_meeting, 10), (list_action_items, 5), (search, 3),
+        (shared_link, 35), (analyze, 5), (send_otp, 7), (verify_otp, 3),
+    ],
+}
+# Statuses that are a correct answer for the route (a wrong or expired OTP is a 400).
+EXPECTED = {"GET /api/v1/shared/{token}": {200, 304}, "POST /api/v1/verify_otp": {200, 400}}
+
+
+# -------------------------
+# Driver and report
+# -------------------------
+def percentile(samples: List[float], q: float) -> float:
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))], 3)
+
+
+def summarize(samples: List[float], errors: int, statuses: Dict[int, int], seconds: float) -> Dict[str, Any]:
+    samples = sorted(samples) or [0.0]
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "throughput_rps": round(len(samples) / seconds, 1) if seconds else 0.0,
+        "p50_ms": percentile(samples, 0.5),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+async def drive(w: Workload, mix: str, requests: int, concurrency: int, rate: Optional[float], warmup: int) -> Dict[str, Any]:
+    """Run `warmup` unrecorded then `requests` recorded operations of `mix`.
+
+    Closed loop with `concurrency` workers by default; with `rate`, requests
+    start on a fixed schedule (at most `concurrency` in flight) and latency is
+    measured from the scheduled start so queueing is not hidden.
+    """
+    ops, weights = zip(*MIXES[mix])
+    plan = w.rng.choices(ops, weights, k=warmup + requests)
+    samples: Dict[str, List[float]] = {}
+    statuses: Dict[str, Dict[int, int]] = {}
+    errors: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, scheduled: float) -> None:
+        async with semaphore:
+            route, status = await plan[i](w)
+        if i < warmup:
+            return
+        samples.setdefault(route, []).append((time.perf_counter() - scheduled) * 1000)
+        statuses.setdefault(route, {}).setdefault(status, 0)
+        statuses[route][status] += 1
+        if status not in EXPECTED.get(route, {200}):
+            errors[route] = errors.get(route, 0) + 1
+
+    if warmup:
+        await asyncio.gather(*(one(i, time.perf_counter()) for i in range(warmup)))
+    start = time.perf_counter()
+    if rate:
+        tasks = []
+        for i in range(warmup, warmup + requests):
+            scheduled = start + (i - warmup) / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            tasks.append(asyncio.create_task(one(i, scheduled)))
+        await asyncio.gather(*tasks)
+    else:
+        queue = iter(range(warmup, warmup + requests))
+
+        async def worker() -> None:
+            for i in queue:
+                await one(i, time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    every = [s for route_samples in samples.values() for s in route_samples]
+    return {
+        **summarize(every, sum(errors.values()), {}, seconds),
+        "seconds": round(seconds, 2),
+        "routes": {
+            route: summarize(samples[route], errors.get(route, 0), statuses[route], seconds) for route in sorted(samples)
+        },
+    }
+
+
+def median_of(runs: List[Any]) -> Any:
+    """Element-wise median of repeated results (numbers), recursing into dicts."""
+    first = runs[0]
+    if isinstance(first, dict):
+        return {k: median_of([r[k] for r in runs if k in r]) for k in first}
+    if isinstance(first, (int, float)) and not isinstance(first, bool):
+        return statistics.median(runs)
+    return first
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[str]:
+    """Regressions of `current` against `baseline`, as readable lines."""
+    found = []
+    for mix, result in current["mixes"].items():
+        base = baseline.get("mixes", {}).get(mix)
+        if not base:
+            continue
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            found.append(f"{mix}: throughput {base['throughput_rps']} -> {result['throughput_rps']} rps")
+        for route, stats in result["routes"].items():
+            old = base["routes"].get(route)
+            if not old:
+                continue
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if stats[key] > old[key] * (1 + tolerance) and stats[key] - old[key] > min_delta_ms:
+                    found.append(f"{mix} {route}: {key} {old[key]} -> {stats[key]}")
+            if stats["errors"] / stats["count"] > old["errors"] / max(1, old["count"]) + 0.01:
+                found.append(f"{mix} {route}: errors {old['errors']}/{old['count']} -> {stats['errors']}/{stats['count']}")
+    return found
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure(args, directory: str, db_path: str) -> None:
+    """Environment main.py reads at import: fakes, scratch paths, limits out of the way."""
+    base_url = start_fake_services(args.sendgrid_latency_ms / 1000, args.firebase_latency_ms / 1000)
+    scratch = os.path.join(directory, "meetings.db")
+    shutil.copyfile(db_path, scratch)
+    os.environ.update(
+        GEMINI_API_KEY="bench",
+        FIREBASE_API_KEY="bench",
+        FIREBASE_PROJECT_ID=PROJECT_ID,
+        FIREBASE_VERIFY_MODE=args.firebase_verify,
+        FIREBASE_CERTS_URL=base_url + "/certs",
+        FIREBASE_LOOKUP_URL=base_url + "/v1/accounts:lookup",
+        SENDGRID_API_KEY="bench",
+        SENDGRID_API_URL=base_url + "/v3/mail/send",
+        MEETINGS_DB_PATH=scratch,
+        ANALYSIS_CACHE_DB_PATH=os.path.join(directory, "analysis_cache.db"),
+        OTP_EMAIL_LIMIT="1000000",
+        OTP_IP_LIMIT="1000000",
+        LLM_QUEUE_TIMEOUT="60",
+        LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+    )
+
+
+async def bench(args, db_path: str) -> Dict[str, Any]:
+    import main
+
+    install_fake_gemini(main.llm_clients, args.gemini_latency_ms / 1000, args.gemini_reply_kb, seed=args.seed)
+    await main.startup_event()
+    try:
+        workload = Workload(AsgiClient(main.app), main.db, args.scale, random.Random(args.seed))
+        mixes = {}
+        for mix in args.mix:
+            runs = [
+                await drive(workload, mix, args.requests, args.concurrency, args.rate, args.warmup)
+                for _ in range(args.repeat)
+            ]
+            mixes[mix] = median_of(runs)
+            print(f"{mix}: {mixes[mix]['throughput_rps']} rps, p50 {mixes[mix]['p50_ms']} ms, "
+                  f"p99 {mixes[mix]['p99_ms']} ms, {mixes[mix]['errors']} errors", file=sys.stderr)
+    finally:
+        await main.shutdown_event()
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "mixes": mixes,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(dataset.SCALES), default="small")
+    parser.add_argument("--mix", nargs="+", choices=sorted(MIXES), default=["dashboard", "shared", "analyze", "otp", "mixed"])
+    parser.add_argument("--requests", type=int, default=2000, help="recorded requests per mix")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rate", type=float, help="open-loop arrival rate (req/s) instead of closed loop")
+    parser.add_argument("--repeat", type=int, default=1, help="run each mix N times and keep the median of each stat")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-latency-ms", type=float, default=300)
+    parser.add_argument("--gemini-reply-kb", type=float, default=2)
+    parser.add_argument("--firebase-latency-ms", type=float, default=5)
+    parser.add_argument("--firebase-verify", choices=["local", "rest"], default="local",
+                        help="verify bench ID tokens against the fake certs (local) or the fake lookup API (rest)")
+    parser.add_argument("--sendgrid-latency-ms", type=float, default=50)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "meetly-bench"))
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="overwrite --baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    db_path = os.path.join(args.data_dir, f"{args.scale}-seed{args.seed}.db")
+    dataset.build_db(db_path, args.scale, args.seed)
+    configure(args, tempfile.mkdtemp(prefix="meetly-load-"), db_path)
+    results = asyncio.run(bench(args, db_path))
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.baseline:
+        if args.update_baseline or not os.path.exists(args.baseline):
+            with open(args.baseline, "w") as f:
+                f.write(output + "\n")
+            print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        else:
+            with open(args.baseline) as f:
+                regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+            for line in regressions:
+                print(f"REGRESSION {line}", file=sys.stderr)
+            print(f"{len(regressions)} regressions against {args.baseline}", file=sys.stderr)
+            sys.exit(1 if regressions else 0)
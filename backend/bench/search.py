@@ -0,0 +1,108 @@
+# bench/search.py – Full-text search latency vs. corpus size
+#
+#   cd backend && python -m bench.search --sizes 10000 100000 300000 --users 3000
+#
+# Builds a synthetic meetings.db per size (cached under --dir) whose
+# transcripts are ~150 words drawn from a Zipf-like vocabulary, indexed
+# through the normal FTS triggers, and times search_meetings() for random
+# users. Query kinds: a common word found in nearly every transcript (bm25
+# scans each term's whole doclist, so this is the worst case), a rarer word,
+# both together, and a partly typed rarer word (a prefix query, served from
+# meetings_fts's prefix indexes).
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from bench.fakes import WORDS
+from search import search_meetings
+from storage import MIGRATIONS, Database
+
+VOCABULARY = WORDS + [f"topic{i}" for i in range(5000)]
+INSERT_SQL = ("INSERT INTO meetings (user_id, user_email, title, date, transcript, summary, summary_preview, "
+              "action_items, decisions, sentiment, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def words(rng: random.Random, count: int) -> List[str]:
+    # Low indexes (the common meeting words) come up far more often than the long tail.
+    return [VOCABULARY[min(len(VOCABULARY) - 1, int(rng.paretovariate(0.8))) - 1] for _ in range(count)]
+
+
+def build_db(path: str, size: int, users: int, batch: int = 20000) -> None:
+    if os.path.exists(path):
+        return
+    rng = random.Random(size)
+    tmp = path + ".partial"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = Database(tmp)
+    db.migrate(MIGRATIONS)
+    for start in range(0, size, batch):
+        rows = []
+        for i in range(start, min(start + batch, size)):
+            summary = [" ".join(words(rng, 8)).capitalize() for _ in range(3)]
+            actions = [{"assignee": "Alice", "task": " ".join(words(rng, 5)), "due": None}]
+            rows.append((
+                f"user{i % users}", f"user{i % users}@meetly.ai", " ".join(words(rng, 3)).title(), "2025-01-01",
+                "\n".join(f"Alice: {' '.join(words(rng, 15))}." for _ in range(10)),
+                json.dumps(summary), json.dumps(summary[:2]), json.dumps(actions), "[]",
+                json.dumps({"sentiment": "neutral", "score": 0.0}),
+                time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_600_000_000 + i * 60)),
+            ))
+        with db.transaction() as cur:
+            cur.executemany(INSERT_SQL, rows)
+    db.close()
+    os.replace(tmp, path)
+
+
+def query(rng: random.Random, kind: str) -> str:
+    rare = rng.choice(VOCABULARY[len(WORDS):len(WORDS) + 500])
+    if kind == "common_word":  # in nearly every transcript: the worst case
+        return rng.choice(WORDS)
+    if kind == "rare_word":
+        return rare
+    if kind == "common_and_rare":
+        return f"{rng.choice(WORDS)} {rare}"
+    return rare[:-1]  # a partly typed rarer term, e.g. "topic12"
+
+
+def run(size: int, users: int, directory: str, runs: int) -> Dict[str, object]:
+    path = os.path.join(directory, f"search_{size}.db")
+    started = time.perf_counter()
+    build_db(path, size, users)
+    built = time.perf_counter() - started
+    db = Database(path, readers=1)
+    rng = random.Random(0)
+    result: Dict[str, object] = {"size": size, "users": users, "build_s": round(built, 1)}
+    for kind in ("common_word", "rare_word", "common_and_rare", "prefix"):
+        samples, hits = [], 0
+        for _ in range(runs):
+            uid, q = f"user{rng.randrange(users)}", query(rng, kind)
+            t = time.perf_counter()
+            found, _ = search_meetings(db, uid, q, 20)
+            samples.append((time.perf_counter() - t) * 1000)
+            hits += len(found)
+        samples.sort()
+        result[kind] = {
+            "p50_ms": round(statistics.median(samples), 3),
+            "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 3),
+            "avg_results": round(hits / runs, 1),
+        }
+    db.close()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--users", type=int, default=3000)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--dir", default=os.path.join(tempfile.gettempdir(), "meetly-bench"))
+    args = parser.parse_args()
+    os.makedirs(args.dir, exist_ok=True)
+    for size in args.sizes:
+        print(json.dumps(run(size, args.users, args.dir, args.runs)))
@@ -0,0 +1,85 @@
+# bench/send_otp.py – send_otp latency and outbox throughput against a fake SendGrid
+#
+#   cd backend && python -m bench.send_otp --requests 2000 --concurrency 50 --delays 0 200
+#
+# Points the outbox at the fake v3 mail/send API (bench/fakes.py), which sleeps
+# `delay` ms per request, and reports send_otp latency plus how fast the
+# background sender drains the outbox. Latency should not move with delay.
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from bench.fakes import FakeServices, start_fake_services
+
+
+def configure(fake_url: str, directory: str) -> None:
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ.update(
+        SENDGRID_API_KEY="bench",
+        SENDGRID_API_URL=fake_url,
+        MEETINGS_DB_PATH=os.path.join(directory, "meetings.db"),
+        OTP_EMAIL_LIMIT="1000000",
+        OTP_IP_LIMIT="1000000",
+    )
+
+
+def percentile(samples, q):
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))], 3)
+
+
+async def run(main, requests: int, concurrency: int, delay_ms: float):
+    from starlette.requests import Request
+
+    FakeServices.sendgrid_delay, FakeServices.calls, FakeServices.delivered = delay_ms / 1000, 0, 0
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        request = Request({"type": "http", "headers": [], "client": (f"10.0.{i % 250}.1", 0)})
+        async with semaphore:
+            t = time.perf_counter()
+            await main.send_otp({"email": f"bench{i}-{delay_ms}@meetly.ai"}, request)
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    accepted = time.perf_counter() - start
+    while FakeServices.delivered < requests:
+        await asyncio.sleep(0.01)
+    drained = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "delay_ms": delay_ms,
+        "requests": requests,
+        "send_otp_p50_ms": percentile(latencies, 0.5),
+        "send_otp_p99_ms": percentile(latencies, 0.99),
+        "send_otp_mean_ms": round(statistics.mean(latencies), 3),
+        "accept_rps": round(requests / accepted, 1),
+        "delivered_per_s": round(requests / drained, 1),
+        "api_calls": FakeServices.calls,
+    }
+
+
+async def bench(args):
+    import main
+
+    await main.startup_event()
+    try:
+        for delay in args.delays:
+            print(json.dumps(await run(main, args.requests, args.concurrency, delay)))
+    finally:
+        await main.shutdown_event()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delays", type=float, nargs="+", default=[0, 200], help="fake API latency (ms)")
+    args = parser.parse_args()
+    configure(start_fake_services() + "/v3/mail/send", tempfile.mkdtemp(prefix="meetly-bench-"))
+    asyncio.run(bench(args))
@@ -0,0 +1,96 @@
+# bench/shared_meeting.py – Public shared-link latency, cold vs. cached
+#
+#   cd backend && python -m bench.shared_meeting --requests 5000 --transcript-kb 50
+#
+# Times the /api/v1/shared/{token} handler with the response cache disabled,
+# with it warm, and for repeat viewers sending If-None-Match, and counts how
+# many database reads each run made.
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+import main  # noqa: E402
+from shared_cache import SharedMeetingCache  # noqa: E402
+from storage import MIGRATIONS, Database  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+TOKEN = "bench-share-token"
+
+
+def build_db(path: str, transcript_kb: int) -> Database:
+    db = Database(path)
+    db.migrate(MIGRATIONS)
+    line = "Alice: let's review the launch checklist and owners for next week.\n"
+    transcript = line * (transcript_kb * 1024 // len(line) + 1)
+    actions = [{"assignee": f"Owner {i}", "task": f"Follow up on item {i}", "due": None} for i in range(8)]
+    db.execute(
+        "INSERT INTO meetings (user_id, user_email, title, date, transcript, summary, action_items, decisions, "
+        "sentiment, share_token) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            "user1", "user1@meetly.ai", "Launch review", "2025-01-01", transcript,
+            json.dumps([f"Point {i}" for i in range(10)]), json.dumps(actions),
+            json.dumps(["Ship on Monday"]), json.dumps({"sentiment": "positive", "score": 0.6}), TOKEN,
+        ),
+    )
+    return db
+
+
+def request(headers=None) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw, "query_string": b""})
+
+
+async def timed(requests: int, headers=None, transcript=False):
+    reads = 0
+    original = main.db.read
+
+    async def counting_read(fn, *args):
+        nonlocal reads
+        reads += 1
+        return await original(fn, *args)
+
+    main.db.read = counting_read
+    samples = []
+    try:
+        for _ in range(requests):
+            t = time.perf_counter()
+            res = await main.get_shared_meeting(TOKEN, request(headers), transcript)
+            samples.append((time.perf_counter() - t) * 1000)
+    finally:
+        main.db.read = original
+    samples.sort()
+    return {
+        "status": res.status_code,
+        "bytes": len(res.body),
+        "p50_ms": round(statistics.median(samples), 4),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 4),
+        "db_reads": reads,
+    }
+
+
+async def bench(args):
+    main.db = build_db(os.path.join(tempfile.mkdtemp(prefix="meetly-bench-"), "meetings.db"), args.transcript_kb)
+    results = {}
+    main.shared_cache = SharedMeetingCache(maxsize=0)
+    results["uncached_with_transcript"] = await timed(args.requests, transcript=True)
+    results["uncached"] = await timed(args.requests)
+    main.shared_cache = SharedMeetingCache(maxsize=1024, ttl=3600)
+    results["cached"] = await timed(args.requests)
+    results["cached_gzip_with_transcript"] = await timed(args.requests, {"Accept-Encoding": "gzip"}, transcript=True)
+    etag = (await main.get_shared_meeting(TOKEN, request(), False)).headers["etag"]
+    results["if_none_match"] = await timed(args.requests, {"If-None-Match": etag})
+    print(json.dumps(results, indent=2))
+    main.db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--transcript-kb", type=int, default=50)
+    asyncio.run(bench(parser.parse_args()))
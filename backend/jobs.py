@@ -0,0 +1,276 @@
+# jobs.py – Durable SQLite-backed job queue with leased in-process workers
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import ERRORS
+from storage import Database
+
+log = logging.getLogger(__name__)
+
+Job = Dict[str, Any]
+RunFn = Callable[[Job], Awaitable[Dict[str, Any]]]
+PersistFn = Callable[[sqlite3.Cursor, Job, Dict[str, Any]], Dict[str, Any]]
+
+JOB_FIELDS = [
+    "id", "kind", "user_id", "payload", "status", "attempts", "max_attempts", "run_after",
+    "lease_owner", "lease_expires_at", "result", "error", "created_at", "started_at", "updated_at",
+]
+JOB_COLUMNS = ", ".join(JOB_FIELDS)
+
+
+def _job_from_row(row: tuple) -> Job:
+    job = dict(zip(JOB_FIELDS, row))
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobQueue:
+    """Jobs live in the `jobs` table; workers claim them with a time-limited lease.
+
+    A worker renews its lease while the job runs. If the process dies, the
+    lease simply expires and any worker (including one in a freshly started
+    process) claims the job again. Failures are retried with exponential
+    backoff until `max_attempts`, after which the job is marked `failed`.
+    Errors for which `is_busy` is true (the LLM limiter is saturated) put the
+    job back after `busy_retry_delay` seconds without charging an attempt.
+
+    Leases are held by `<worker_id>-<n>`. With a random worker_id (the
+    default) a crashed process's jobs wait for their lease to expire; with a
+    stable one (JOB_WORKER_ID, e.g. the container name) `recover` requeues
+    them as soon as the process starts again.
+
+    Each kind has a `run` coroutine (the slow part, outside any transaction)
+    and an optional `persist` step that runs inside the same transaction that
+    marks the job succeeded, so side effects are never written twice.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        workers: int = 2,
+        lease_seconds: float = 120,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 5.0,
+        is_busy: Callable[[Exception], bool] = lambda e: False,
+        busy_retry_delay: float = 5.0,
+        worker_id: Optional[str] = None,
+    ):
+        self.db = db
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.is_busy = is_busy
+        self.busy_retry_delay = busy_retry_delay
+        self.worker_id = worker_id or uuid.uuid4().hex[:8]
+        self._handlers: Dict[str, tuple] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, run: RunFn, persist: Optional[PersistFn] = None) -> None:
+        self._handlers[kind] = (run, persist)
+
+    # -------------------------
+    # Sync operations (run on the db threads)
+    # -------------------------
+    def enqueue(self, kind: str, user_id: str, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.db.execute(
+            """INSERT INTO jobs (id, kind, user_id, payload, status, attempts, max_attempts, run_after, created_at, updated_at)
+               VALUES (?, ?, ?, ?, 'queued', 0, ?, ?, ?, ?)""",
+            (job_id, kind, user_id, json.dumps(payload), self.max_attempts, now, now, now),
+        )
+        return job_id
+
+    def get(self, job_id: str, user_id: str) -> Optional[Job]:
+        row = self.db.fetchone(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ? AND user_id = ?", (job_id, user_id))
+        return _job_from_row(row) if row else None
+
+    def claim(self, owner: str) -> Optional[Job]:
+        """Lease the next runnable job: queued and due, or running with an expired lease."""
+        now = time.time()
+        with self.db.transaction() as cur:
+            row = cur.execute(
+                f"""SELECT {JOB_COLUMNS} FROM jobs
+                    WHERE (status = 'queued' AND run_after <= ?)
+                       OR (status = 'running' AND lease_expires_at < ?)
+                    ORDER BY run_after LIMIT 1""",
+                (now, now),
+            ).fetchone()
+            if not row:
+                return None
+            job = _job_from_row(row)
+            if job["status"] == "running":
+                log.info("Reclaiming job from expired lease", extra={"job_id": job["id"], "lease_owner": job["lease_owner"]})
+            cur.execute(
+                """UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?,
+                       lease_expires_at = ?, started_at = ?, updated_at = ? WHERE id = ?""",
+                (owner, now + self.lease_seconds, now, now, job["id"]),
+            )
+        job.update(status="running", attempts=job["attempts"] + 1, lease_owner=owner, started_at=now)
+        return job
+
+    def recover(self) -> int:
+        """Requeue running jobs whose lease expired or that this worker_id held before a restart.
+
+        A job that was already on its last attempt is failed instead, so a job
+        that crashes its worker cannot crash every restart.
+        """
+        now, owner = time.time(), f"{self.worker_id}-"
+        cur = self.db.execute(
+            """UPDATE jobs SET
+                   status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                   error = CASE WHEN attempts >= max_attempts THEN 'Worker lost during the final attempt' ELSE error END,
+                   lease_owner = NULL, lease_expires_at = NULL, run_after = ?, updated_at = ?
+               WHERE status = 'running' AND (lease_expires_at < ? OR substr(lease_owner, 1, ?) = ?)""",
+            (now, now, now, len(owner), owner),
+        )
+        if cur.rowcount:
+            log.info("Recovered jobs from lost workers", extra={"jobs": cur.rowcount, "worker_id": self.worker_id})
+        return cur.rowcount
+
+    def renew(self, job: Job) -> bool:
+        cur = self.db.execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+            (time.time() + self.lease_seconds, time.time(), job["id"], job["lease_owner"]),
+        )
+        return cur.rowcount == 1
+
+    def succeed(self, job: Job, result: Dict[str, Any], persist: Optional[PersistFn]) -> bool:
+        with self.db.transaction() as cur:
+            owned = cur.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (job["id"], job["lease_owner"]),
+            ).fetchone()
+            if not owned:
+                return False
+            if persist:
+                result = persist(cur, job, result)
+            cur.execute(
+                """UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, lease_owner = NULL,
+                       lease_expires_at = NULL, updated_at = ? WHERE id = ?""",
+                (json.dumps(result), time.time(), job["id"]),
+            )
+        return True
+
+    def fail(self, job: Job, error: str) -> str:
+        now = time.time()
+        if job["attempts"] < job["max_attempts"]:
+            status, run_after = "queued", now + self.retry_backoff * (2 ** (job["attempts"] - 1))
+        else:
+            status, run_after = "failed", job["run_after"]
+        self.db.execute(
+            """UPDATE jobs SET status = ?, run_after = ?, error = ?, lease_owner = NULL, lease_expires_at = NULL,
+                   updated_at = ? WHERE id = ? AND lease_owner = ?""",
+            (status, run_after, error[:2000], now, job["id"], job["lease_owner"]),
+        )
+        return status
+
+    def release(self, job: Job, delay: float = 0.0) -> None:
+        """Hand a job back to the queue without charging an attempt, due again in `delay` seconds."""
+        now = time.time()
+        self.db.execute(
+            """UPDATE jobs SET status = 'queued', attempts = attempts - 1, lease_owner = NULL,
+                   lease_expires_at = NULL, run_after = ?, updated_at = ? WHERE id = ? AND lease_owner = ?""",
+            (now + delay, now, job["id"], job["lease_owner"]),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        counts = dict(self.db.fetchall("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        oldest_queued = self.db.fetchone("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'")[0]
+        oldest_running = self.db.fetchone("SELECT MIN(started_at) FROM jobs WHERE status = 'running'")[0]
+        expired = self.db.fetchone(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'running' AND lease_expires_at < ?", (now,)
+        )[0]
+        return {
+            "depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "succeeded": counts.get("succeeded", 0),
+            "failed": counts.get("failed", 0),
+            "expired_leases": expired,
+            "oldest_queued_age_s": round(now - oldest_queued, 1) if oldest_queued else 0.0,
+            "oldest_running_age_s": round(now - oldest_running, 1) if oldest_running else 0.0,
+            "workers": len(self._tasks),
+        }
+
+    # -------------------------
+    # Async API
+    # -------------------------
+    async def submit(self, kind: str, user_id: str, payload: Dict[str, Any]) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind {kind!r}")
+        job_id = await self.db.write(self.enqueue, kind, user_id, payload)
+        if self._wakeup:
+            self._wakeup.set()
+        return job_id
+
+    def start(self) -> None:
+        """Spawn the worker tasks on the running event loop."""
+        if self._tasks or self.workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self.worker_id}-{i}")) for i in range(self.workers)
+        ]
+        log.info("Started job workers", extra={"workers": self.workers, "worker_id": self.worker_id})
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await self.db.write(self.renew, job):
+                return
+
+    async def _worker(self, owner: str) -> None:
+        while True:
+            job = await self.db.write(self.claim, owner)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        run, persist = self._handlers.get(job["kind"], (None, None))
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            if run is None:
+                raise RuntimeError(f"No handler registered for job kind {job['kind']!r}")
+            result = await run(job)
+            if not await self.db.write(self.succeed, job, result, persist):
+                log.warning("Lost lease on job; result discarded", extra={"job_id": job["id"]})
+        except asyncio.CancelledError:
+            await asyncio.shield(self.db.write(self.release, job))
+            raise
+        except Exception as e:
+            if self.is_busy(e):
+                await self.db.write(self.release, job, self.busy_retry_delay)
+                log.info("LLM busy; job requeued", extra={"job_id": job["id"], "retry_in_s": self.busy_retry_delay})
+                return
+            detail = getattr(e, "detail", None) or str(e)
+            status = await self.db.write(self.fail, job, str(detail))
+            ERRORS.inc(component="jobs", kind=job["kind"])
+            log.error(
+                "Job attempt failed",
+                extra={"job_id": job["id"], "attempt": job["attempts"], "error": str(detail), "status": status},
+            )
+        finally:
+            heartbeat.cancel()
@@ -0,0 +1,477 @@
+# llm.py – Non-blocking Gemini clients and the model router for Meetly.AI
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+
+from analysis import estimate_tokens
+from metrics import ERRORS, LLM_CALL_SECONDS, LLM_CALLS, LLM_TOKENS
+
+log = logging.getLogger(__name__)
+
+
+class LLMBusyError(Exception):
+    """Raised when every LLM slot is taken and the caller should retry later."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM capacity exhausted, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMBusyError):
+    """Raised when every model's circuit breaker is open."""
+
+
+class GeminiClient:
+    """Shares one `GenerativeModel` per process and caps in-flight calls.
+
+    The blocking `generate_content` call runs on a dedicated executor sized to
+    the concurrency limit, so the event loop keeps serving other requests
+    while Gemini is working. When all slots are busy, callers wait at most
+    `queue_timeout` seconds before getting `LLMBusyError`.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_concurrency: int = 4,
+        queue_timeout: float = 0.0,
+        retry_after: int = 5,
+        model_factory: Callable[[str], Any] = genai.GenerativeModel,
+    ):
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.model = model_factory(model_name)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+        self.in_flight = 0
+
+    def has_capacity(self) -> bool:
+        return not self._semaphore.locked()
+
+    async def _acquire(self) -> None:
+        if self.queue_timeout <= 0:
+            if self._semaphore.locked():
+                raise LLMBusyError(self.retry_after)
+            await self._semaphore.acquire()
+            return
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMBusyError(self.retry_after)
+
+    async def generate(self, prompt: str) -> str:
+        """Run `generate_content` off the event loop and return the response text.
+
+        If the caller is cancelled (e.g. a hedged duplicate lost), the slot is
+        held until the executor thread actually finishes.
+        """
+        await self._acquire()
+        self.in_flight += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._executor, self.model.generate_content, prompt
+            )
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        response = await asyncio.shield(future)
+        text = getattr(response, "text", "")
+        self._count_tokens(response, prompt, text)
+        return text
+
+    def _count_tokens(self, response: Any, prompt: str, text: str) -> None:
+        """Record Gemini's reported usage, or an estimate when the reply has none."""
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt)
+        output_tokens = getattr(usage, "candidates_token_count", None) or estimate_tokens(text)
+        LLM_TOKENS.inc(prompt_tokens, model=self.model_name, kind="prompt")
+        LLM_TOKENS.inc(output_tokens, model=self.model_name, kind="output")
+
+    def _release(self, _future: Any = None) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def stream(self, prompt: str) -> "SlotStream":
+        """Reserve a slot, then return an iterator over streamed response text.
+
+        The slot is taken before this coroutine returns, so `LLMBusyError`
+        surfaces before any bytes of a streaming response are sent. The
+        returned `SlotStream` gives it back even if it is never iterated.
+        """
+        await self._acquire()
+        self.in_flight += 1
+        return SlotStream(self._stream(prompt), self._release)
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = Event()
+        done = object()
+
+        def produce() -> None:
+            chunk, streamed = None, []
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    if stop.is_set():
+                        break
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        text = ""
+                    streamed.append(text)
+                    loop.call_soon_threadsafe(queue.put_nowait, text)
+                # The last chunk carries usage for the whole reply.
+                self._count_tokens(chunk, prompt, "".join(streamed))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        try:
+            loop.run_in_executor(self._executor, produce)
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if item:
+                    yield item
+        finally:
+            stop.set()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SlotStream:
+    """Async iterator over streamed text that owns one limiter slot.
+
+    The slot is released exactly once: when iteration ends or fails, on
+    `aclose()`, or when the stream is dropped without ever being iterated
+    (e.g. the client disconnected before the response body was read).
+    """
+
+    def __init__(self, chunks: AsyncGenerator[str, None], release: Callable[[], None]):
+        self._chunks = chunks
+        self._release_slot: Optional[Callable[[], None]] = release
+
+    def __aiter__(self) -> "SlotStream":
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return await self._chunks.__anext__()
+        except BaseException:
+            self.release()
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self._chunks.aclose()
+        finally:
+            self.release()
+
+    def release(self) -> None:
+        release, self._release_slot = self._release_slot, None
+        if release is not None:
+            release()
+
+    def __del__(self) -> None:
+        self.release()
+
+
+# -------------------------
+# Routing
+# -------------------------
+class LatencyTracker:
+    """Sliding window of recent call latencies (seconds)."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures.
+
+    After `reset_timeout` seconds one half-open probe is let through: success
+    closes the circuit, failure opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if self._clock() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state, self.failures, self._probing = "closed", 0, False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state, self._opened_at = "open", self._clock()
+        self._probing = False
+
+    def release(self) -> None:
+        """An attempt ended without a verdict (busy or cancelled); let another call probe."""
+        self._probing = False
+
+    def retry_after(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+
+class ModelRouter:
+    """Sends each prompt to a tier of `GeminiClient`s, first client being the primary.
+
+    - Short prompts (<= `fast_tier_tokens`) try the fast tier (second client) first.
+    - A call slower than the model's `hedge_percentile` latency gets a hedged
+      duplicate; the first reply wins and the other is cancelled.
+    - Each model has a `CircuitBreaker`; failing or open models fall through
+      to the next tier.
+    Every attempt's latency (including cancelled losers, as a lower bound)
+    feeds the per-model window the hedge delay is computed from.
+    """
+
+    def __init__(
+        self,
+        clients: List[GeminiClient],
+        fast_tier_tokens: int = 2000,
+        hedging: bool = True,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 1.0,
+        hedge_max_delay: float = 20.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.clients = clients
+        self.primary = clients[0]
+        self.fast = clients[1] if len(clients) > 1 else None
+        self.fast_tier_tokens = fast_tier_tokens
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self._clock = clock
+        self.latency = {c.model_name: LatencyTracker() for c in clients}
+        self.breakers = {c.model_name: CircuitBreaker(failure_threshold, reset_timeout, clock) for c in clients}
+        self.counters = {
+            c.model_name: {"attempts": 0, "successes": 0, "failures": 0, "hedges": 0, "hedge_wins": 0}
+            for c in clients
+        }
+
+    def _order(self, prompt: str) -> List[GeminiClient]:
+        if self.fast and estimate_tokens(prompt) <= self.fast_tier_tokens:
+            return [self.fast] + [c for c in self.clients if c is not self.fast]
+        return list(self.clients)
+
+    def preferred_model(self, prompt: str) -> str:
+        """Name of the model `generate` tries first for `prompt`."""
+        return self._order(prompt)[0].model_name
+
+    def hedge_delay(self, client: GeminiClient) -> float:
+        observed = self.latency[client.model_name].percentile(self.hedge_percentile)
+        if observed is None:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, observed))
+
+    def _busy(self, name: str) -> None:
+        self.counters[name]["attempts"] -= 1
+        LLM_CALLS.inc(model=name, outcome="busy")
+        self.breakers[name].release()
+
+    def _cancelled(self, name: str, started: float) -> None:
+        self.latency[name].record(self._clock() - started)
+        LLM_CALLS.inc(model=name, outcome="cancelled")
+        self.breakers[name].release()
+
+    def _failed(self, name: str, error: Exception) -> None:
+        self.counters[name]["failures"] += 1
+        LLM_CALLS.inc(model=name, outcome="error")
+        ERRORS.inc(component="llm", kind=type(error).__name__)
+        self.breakers[name].record_failure()
+
+    def _succeeded(self, name: str, started: float) -> None:
+        elapsed = self._clock() - started
+        self.latency[name].record(elapsed)
+        LLM_CALL_SECONDS.observe(elapsed, model=name)
+        LLM_CALLS.inc(model=name, outcome="ok")
+        self.counters[name]["successes"] += 1
+        self.breakers[name].record_success()
+
+    async def _attempt(self, client: GeminiClient, prompt: str) -> str:
+        name = client.model_name
+        self.counters[name]["attempts"] += 1
+        started = self._clock()
+        try:
+            text = await client.generate(prompt)
+        except LLMBusyError:
+            self._busy(name)
+            raise
+        except asyncio.CancelledError:
+            self._cancelled(name, started)
+            raise
+        except Exception as e:
+            self._failed(name, e)
+            raise
+        self._succeeded(name, started)
+        return text
+
+    async def _hedged(self, client: GeminiClient, prompt: str) -> str:
+        first = asyncio.create_task(self._attempt(client, prompt))
+        pending = {first}
+        hedge = None
+        try:
+            if self.hedging:
+                done, _ = await asyncio.wait(pending, timeout=self.hedge_delay(client))
+                if not done and client.has_capacity():
+                    hedge = asyncio.create_task(self._attempt(client, prompt))
+                    pending.add(hedge)
+                    self.counters[client.model_name]["hedges"] += 1
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters[client.model_name]["hedge_wins"] += 1
+                        return task.result()
+                    if error is None or isinstance(error, LLMBusyError):
+                        error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate(self, prompt: str) -> Tuple[str, str]:
+        """The reply text and the name of the model that produced it."""
+        error: Optional[Exception] = None
+        for client in self._order(prompt):
+            if not self.breakers[client.model_name].allow():
+                continue
+            try:
+                return await self._hedged(client, prompt), client.model_name
+            except Exception as e:
+                log.warning("LLM tier failed; trying next", extra={"model": client.model_name, "error": str(e)})
+                if error is None or isinstance(error, LLMBusyError):
+                    error = e
+        if error is not None:
+            raise error
+        retry_after = min(b.retry_after() for b in self.breakers.values())
+        raise CircuitOpenError(max(1, int(retry_after + 0.999)))
+
+    async def stream(self, prompt: str) -> Tuple[SlotStream, str]:
+        """A stream of reply text and the name of the model producing it.
+
+        Tiers are tried in `generate` order, skipping open circuits, but not
+        hedged. A model that is busy or fails before its first chunk falls
+        through to the next tier; once text has been handed out, a failure
+        ends the stream. The breaker and metrics see the call when the
+        stream is exhausted, fails or is closed early.
+        """
+        error: Optional[Exception] = None
+        for client in self._order(prompt):
+            name = client.model_name
+            if not self.breakers[name].allow():
+                continue
+            self.counters[name]["attempts"] += 1
+            started = self._clock()
+            try:
+                chunks = await client.stream(prompt)
+            except LLMBusyError as e:
+                self._busy(name)
+                if error is None:
+                    error = e
+                continue
+            try:
+                first: Optional[str] = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = None
+            except asyncio.CancelledError:
+                self._cancelled(name, started)
+                raise
+            except Exception as e:
+                self._failed(name, e)
+                log.warning("LLM tier failed; trying next", extra={"model": name, "error": str(e)})
+                if error is None or isinstance(error, LLMBusyError):
+                    error = e
+                continue
+
+            def release(chunks: SlotStream = chunks, name: str = name) -> None:
+                chunks.release()
+                self.breakers[name].release()
+
+            return SlotStream(self._observe(name, chunks, first, started), release), name
+        if error is not None:
+            raise error
+        retry_after = min(b.retry_after() for b in self.breakers.values())
+        raise CircuitOpenError(max(1, int(retry_after + 0.999)))
+
+    async def _observe(self, name: str, chunks: SlotStream, first: Optional[str], started: float) -> AsyncIterator[str]:
+        try:
+            if first is not None:
+                yield first
+            async for text in chunks:
+                yield text
+        except GeneratorExit:
+            self._cancelled(name, started)
+            raise
+        except Exception as e:
+            self._failed(name, e)
+            raise
+        finally:
+            await chunks.aclose()
+        self._succeeded(name, started)
+
+    def stats(self) -> Dict[str, Any]:
+        models = {}
+        for client in self.clients:
+            name = client.model_name
+            latency = self.latency[name]
+            p50, p95 = latency.percentile(0.5), latency.percentile(0.95)
+            models[name] = {
+                "circuit": self.breakers[name].state,
+                "in_flight": client.in_flight,
+                "p50_s": round(p50, 3) if p50 is not None else None,
+                "p95_s": round(p95, 3) if p95 is not None else None,
+                "hedge_delay_s": round(self.hedge_delay(client), 3),
+                **self.counters[name],
+            }
+        return {"primary": self.primary.model_name, "fast": self.fast.model_name if self.fast else None, "models": models}
@@ -1,20 +1,51 @@
 # main.py – Meetly.AI Gemini Edition (Final Stable Build)
 import os
 import json
-import sqlite3
+import asyncio
+import base64
+import logging
 import uuid
-import random
-import time
-import requests
-from typing import Optional, List, Dict, Any
-from fastapi import FastAPI, HTTPException, Header, Depends
+from datetime import date
+from typing import Optional, List, Dict, Any, Tuple
+from fastapi import FastAPI, HTTPException, Header, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
 from dotenv import load_dotenv
 import google.generativeai as genai
-from threading import Lock
-import sendgrid 
-from sendgrid.helpers.mail import Mail
+from auth import (
+    FIREBASE_CERTS_URL,
+    FIREBASE_LOOKUP_URL,
+    FirebaseRestVerifier,
+    FirebaseTokenVerifier,
+    PublicKeyCache,
+    VerifiedTokenCache,
+)
+from llm import CircuitOpenError, GeminiClient, LLMBusyError, ModelRouter
+from analysis_cache import AnalysisCache, cache_key
+from analysis import (
+    ANALYZE_PROMPT,
+    PROMPT_VERSION,
+    AnalysisFormatError,
+    AnalysisPipeline,
+    analysis_events,
+    analysis_fields,
+    estimate_tokens,
+    model_label,
+    parse_analysis,
+)
+from streaming import AnalysisStreamParser, sse_event
+from storage import MIGRATIONS, Database
+from search import search_meetings
+from stats import get_stats
+from action_items import ACTION_ITEM_STATUSES, list_action_items, meeting_action_items, update_action_item
+from jobs import JobQueue
+from ttl_store import MemoryTTLStore, SQLiteTTLStore
+from otp import OTPError, OTPManager, OTPRateLimitedError
+from outbox import SENDGRID_API_URL, EmailOutbox, SendGridSender
+from shared_cache import SharedMeetingCache, etag_matches, gzip_etag
+from logs import setup_logging
+from metrics import CONTENT_TYPE, ERRORS, Gauge, MetricsMiddleware, TimedRoute, render as render_metrics, stage
 
 # -------------------------
 # Environment + Gemini setup
@@ -22,45 +53,63 @@ from sendgrid.helpers.mail import Mail
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(BASE_DIR, ".env"))
 
+# LOG_LEVEL=OFF silences logging; LOG_SAMPLE_RATE < 1 keeps that share of DEBUG/INFO lines.
+setup_logging(
+    os.getenv("LOG_LEVEL", "INFO"),
+    os.getenv("LOG_FORMAT", "json"),
+    float(os.getenv("LOG_SAMPLE_RATE", "1")),
+)
+log = logging.getLogger("meetly")
+
 API_KEY = os.getenv("GEMINI_API_KEY")
 if not API_KEY:
     raise RuntimeError("GEMINI_API_KEY not found in .env file.")
 genai.configure(api_key=API_KEY)
-print("✅ Gemini configured")
+log.info("Gemini configured")
 
 # -------------------------
 # Firebase Verification
 # -------------------------
 FIREBASE_API_KEY = os.getenv("FIREBASE_API_KEY")
-if not FIREBASE_API_KEY:
-    print("⚠️ FIREBASE_API_KEY not found in .env (user scoping disabled)")
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
+# "local" verifies ID tokens against Google's cached signing keys,
+# "rest" falls back to one accounts:lookup round-trip per request.
+FIREBASE_VERIFY_MODE = os.getenv("FIREBASE_VERIFY_MODE", "local" if FIREBASE_PROJECT_ID else "rest").lower()
+FIREBASE_TOKEN_CACHE_SIZE = int(os.getenv("FIREBASE_TOKEN_CACHE_SIZE", "1024"))
+
+
+def build_token_verifier():
+    """Pick the token verifier configured by FIREBASE_VERIFY_MODE."""
+    if FIREBASE_VERIFY_MODE == "local" and FIREBASE_PROJECT_ID:
+        log.info("Firebase tokens verified locally", extra={"project": FIREBASE_PROJECT_ID})
+        return FirebaseTokenVerifier(
+            FIREBASE_PROJECT_ID,
+            key_cache=PublicKeyCache(os.getenv("FIREBASE_CERTS_URL", FIREBASE_CERTS_URL)),
+            token_cache=VerifiedTokenCache(maxsize=FIREBASE_TOKEN_CACHE_SIZE),
+        )
+    if FIREBASE_API_KEY:
+        if FIREBASE_VERIFY_MODE == "local":
+            log.warning("FIREBASE_PROJECT_ID not set; falling back to REST token lookup")
+        return FirebaseRestVerifier(FIREBASE_API_KEY, lookup_url=os.getenv("FIREBASE_LOOKUP_URL", FIREBASE_LOOKUP_URL))
+    log.warning("Neither FIREBASE_PROJECT_ID nor FIREBASE_API_KEY set; user scoping disabled")
+    return None
+
+
+token_verifier = build_token_verifier()
 
 
 def verify_firebase_token(authorization: str = Header(None)):
-    """Verify Firebase ID token from the frontend using Firebase REST API."""
+    """Verify Firebase ID token from the frontend (locally or via Firebase REST API)."""
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing Authorization header.")
-    if not FIREBASE_API_KEY:
-        raise HTTPException(status_code=500, detail="FIREBASE_API_KEY not configured.")
+    if token_verifier is None:
+        raise HTTPException(status_code=500, detail="Firebase token verification not configured.")
     try:
         token = authorization.split(" ")[1]
-        res = requests.post(
-            f"https://identitytoolkit.googleapis.com/v1/accounts:lookup?key={FIREBASE_API_KEY}",
-            json={"idToken": token},
-            timeout=10,
-        )
-        if res.status_code != 200:
-            raise HTTPException(status_code=401, detail="Token verification failed")
-        data = res.json()
-        if "users" not in data:
-            raise HTTPException(status_code=401, detail="Unauthorized user")
-        user = data["users"][0]
-        print(f"✅ Firebase verified: {user.get('email')}")
-        return {
-            "uid": user["localId"],
-            "email": user.get("email", ""),
-            "name": user.get("displayName", ""),
-        }
+        with stage("auth"):
+            user = token_verifier.verify(token)
+        log.debug("Firebase token verified", extra={"uid": user.get("uid")})
+        return user
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid Firebase token: {str(e)}")
 
@@ -75,73 +124,128 @@ if API_KEY:
     try:
         genai.configure(api_key=API_KEY)
         MODEL = os.getenv("GEMINI_MODEL", DEFAULT_MODEL)
-        print(f"✅ Gemini configured successfully using API key. Model set to: {MODEL}")
+        log.info("Gemini model selected", extra={"model": MODEL})
     except Exception as e:
-        print(f"⚠️ Gemini initialization failed: {e}. Falling back to default model: {DEFAULT_MODEL}")
+        log.warning("Gemini initialization failed; using default model", extra={"error": str(e), "model": DEFAULT_MODEL})
         MODEL = DEFAULT_MODEL
 else:
-    print(f"⚠️ GEMINI_API_KEY not found. Using default model: {DEFAULT_MODEL}")
+    log.warning("GEMINI_API_KEY not found; using default model", extra={"model": DEFAULT_MODEL})
     MODEL = DEFAULT_MODEL
 
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "0"))
+LLM_RETRY_AFTER = int(os.getenv("LLM_RETRY_AFTER", "5"))
+llm_client = GeminiClient(
+    MODEL,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    queue_timeout=LLM_QUEUE_TIMEOUT,
+    retry_after=LLM_RETRY_AFTER,
+)
+# Faster tier for short transcripts and for when the primary is degraded ("" disables it).
+FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.0-flash-lite")
+llm_clients = [llm_client]
+if FAST_MODEL and FAST_MODEL != MODEL:
+    llm_clients.append(GeminiClient(
+        FAST_MODEL,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        queue_timeout=LLM_QUEUE_TIMEOUT,
+        retry_after=LLM_RETRY_AFTER,
+    ))
+llm_router = ModelRouter(
+    llm_clients,
+    fast_tier_tokens=int(os.getenv("LLM_FAST_TIER_TOKENS", "2000")),
+    hedging=os.getenv("LLM_HEDGING", "true").lower() == "true",
+    hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+    hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0")),
+    hedge_max_delay=float(os.getenv("LLM_HEDGE_MAX_DELAY", "20")),
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+)
+Gauge("meetly_llm_in_flight", "LLM calls holding a concurrency slot.", ("model",),
+      lambda: {(c.model_name,): c.in_flight for c in llm_clients})
+Gauge("meetly_llm_circuit_open", "1 while a model's circuit breaker is not closed.", ("model",),
+      lambda: {(name,): int(b.state != "closed") for name, b in llm_router.breakers.items()})
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+def require_operator(authorization: str = Header(None)):
+    """Operator-only JSON endpoints: `Bearer $METRICS_TOKEN`, closed when no token is set."""
+    if not METRICS_TOKEN or authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=403, detail="Operator token required.")
+
 DB_FILE = os.getenv("MEETINGS_DB_PATH", "meetings.db")
+ANALYSIS_CACHE_DB_PATH = os.getenv(
+    "ANALYSIS_CACHE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(DB_FILE)), "analysis_cache.db"),
+)
+db = Database(DB_FILE, readers=int(os.getenv("DB_READERS", "4")))
+analysis_cache = AnalysisCache(
+    Database(ANALYSIS_CACHE_DB_PATH, readers=1),
+    max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "10000")),
+    max_age=float(os.getenv("ANALYSIS_CACHE_MAX_AGE_DAYS", "30")) * 24 * 3600,
+    hit_flush_interval=float(os.getenv("ANALYSIS_CACHE_HIT_FLUSH_SECONDS", "30")),
+)
+
+MAX_PAGE_SIZE = 100
+
+SHARED_CACHE_CONTROL = os.getenv(
+    "SHARED_CACHE_CONTROL", "public, max-age=60, s-maxage=60, stale-while-revalidate=300"
+)
+shared_cache = SharedMeetingCache(
+    maxsize=int(os.getenv("SHARED_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SHARED_CACHE_TTL", "60")),
+)
 
 # -------------------------
 # Database setup
 # -------------------------
+# The functions below are blocking; handlers run them via `db.read` / `db.write`.
 def init_db():
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS meetings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_email TEXT,
-            user_id TEXT,
-            title TEXT,
-            date TEXT,
-            transcript TEXT,
-            summary TEXT,
-            action_items TEXT,
-            decisions TEXT,
-            sentiment TEXT,
-            share_token TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    db.migrate(MIGRATIONS)
+    analysis_cache.init()
+
+def encode_cursor(created_at: str, meeting_id: int) -> str:
+    raw = json.dumps([created_at, meeting_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, meeting_id = json.loads(raw)
+        return str(created_at), int(meeting_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+def list_meetings(user_id: str, limit: int = 50, after: Optional[tuple] = None):
+    """One page of a user's meetings, newest first, plus the cursor for the next page.
+
+    Keyset pagination on (created_at, id) is served straight from the covering
+    idx_meetings_user_created index, so page cost does not grow with history.
+    """
+    if after:
+        rows = db.fetchall(
+            "SELECT id, title, date, summary_preview, created_at FROM meetings "
+            "WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, after[0], after[1], limit + 1),
         )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT,
-            user_email TEXT,
-            message TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    else:
+        rows = db.fetchall(
+            "SELECT id, title, date, summary_preview, created_at FROM meetings "
+            "WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, limit + 1),
         )
-    """)
-    con.commit()
-    con.close()
-
-def list_meetings(user_id: str, limit: int = 50):
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute(
-        "SELECT id, title, date, summary, created_at FROM meetings WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
-        (user_id, limit),
-    )
-    rows = cur.fetchall()
-    con.close()
-    return [
-        {"id": r[0], "title": r[1], "date": r[2], "summary_preview": json.loads(r[3])[:2] if r[3] else [], "created_at": r[4]}
-        for r in rows
+    next_cursor = encode_cursor(rows[limit - 1][4], rows[limit - 1][0]) if len(rows) > limit else None
+    meetings = [
+        {"id": r[0], "title": r[1], "date": r[2], "summary_preview": json.loads(r[3]) if r[3] else [], "created_at": r[4]}
+        for r in rows[:limit]
     ]
+    return meetings, next_cursor
 
 def get_meeting(meeting_id: int, user_id: str):
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute(
-        "SELECT id, title, date, transcript, summary, action_items, decisions, sentiment, created_at FROM meetings WHERE id = ? AND user_id = ?",
+    row = db.fetchone(
+        "SELECT id, title, date, transcript, summary, decisions, sentiment, created_at FROM meetings WHERE id = ? AND user_id = ?",
         (meeting_id, user_id),
     )
-    row = cur.fetchone()
-    con.close()
     if not row:
         return None
     return {
@@ -150,16 +254,88 @@ def get_meeting(meeting_id: int, user_id: str):
         "date": row[2],
         "transcript": row[3],
         "summary": json.loads(row[4]) if row[4] else [],
-        "action_items": json.loads(row[5]) if row[5] else [],
-        "decisions": json.loads(row[6]) if row[6] else [],
-        "sentiment": json.loads(row[7]) if row[7] else {},
-        "created_at": row[8],
+        "action_items": meeting_action_items(db, row[0]),
+        "decisions": json.loads(row[5]) if row[5] else [],
+        "sentiment": json.loads(row[6]) if row[6] else {},
+        "created_at": row[7],
     }
 
+INSERT_MEETING_SQL = """INSERT INTO meetings (user_id, user_email, title, date, transcript, summary, summary_preview,
+                                 action_items, decisions, sentiment, analysis_key)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+def meeting_row(user_id: str, user_email: str, title: Optional[str], date: Optional[str],
+                transcript: str, fields: Dict[str, Any], analysis_key: Optional[str] = None) -> tuple:
+    return (user_id, user_email, title, date, transcript,
+            json.dumps(fields["summary"]), json.dumps(fields["summary"][:2]), json.dumps(fields["action_items"]),
+            json.dumps(fields["decisions"]), json.dumps(fields["sentiment"]), analysis_key)
+
+def insert_meeting(cur, user_id: str, user_email: str, title: Optional[str], date: Optional[str],
+                   transcript: str, fields: Dict[str, Any], analysis_key: Optional[str] = None) -> int:
+    cur.execute(INSERT_MEETING_SQL, meeting_row(user_id, user_email, title, date, transcript, fields, analysis_key))
+    return cur.lastrowid
+
+def save_meetings(rows: List[tuple]) -> List[int]:
+    """Insert many `meeting_row` tuples in one transaction; returns their ids in order."""
+    with db.transaction() as cur:
+        return [cur.execute(f"{INSERT_MEETING_SQL} RETURNING id", row).fetchone()[0] for row in rows]
+
+def save_meeting(user_id: str, user_email: str, title: Optional[str], date: Optional[str],
+                 transcript: str, fields: Dict[str, Any], analysis_key: Optional[str] = None) -> int:
+    with db.transaction() as cur:
+        return insert_meeting(cur, user_id, user_email, title, date, transcript, fields, analysis_key)
+
+def get_or_create_share_token(meeting_id: int, user_id: str) -> Optional[str]:
+    """Existing share token for an owned meeting, creating one if needed; None if not owned."""
+    with db.transaction() as cur:
+        row = cur.execute("SELECT user_id, share_token FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+        if not row or row[0] != user_id:
+            return None
+        if row[1]:
+            return row[1]
+        token = str(uuid.uuid4())
+        cur.execute("UPDATE meetings SET share_token = ? WHERE id = ?", (token, meeting_id))
+        return token
+
+def get_shared_meeting_by_token(token: str, include_transcript: bool = False):
+    """(meeting_id, public payload) for a share token; the transcript only when asked for."""
+    row = db.fetchone(
+        "SELECT id, title, date, summary, decisions, sentiment, created_at"
+        + (", transcript" if include_transcript else "")
+        + " FROM meetings WHERE share_token = ?",
+        (token,),
+    )
+    if not row:
+        return None
+    meeting = {
+        "title": row[1],
+        "date": row[2],
+        "summary": json.loads(row[3]) if row[3] else [],
+        "action_items": meeting_action_items(db, row[0]),
+        "decisions": json.loads(row[4]) if row[4] else [],
+        "sentiment": json.loads(row[5]) if row[5] else {},
+        "created_at": row[6],
+    }
+    if include_transcript:
+        meeting["transcript"] = row[7]
+    return row[0], meeting
+
+def save_feedback(user_id: str, user_email: str, message: str) -> None:
+    db.execute("INSERT INTO feedback (user_id, user_email, message) VALUES (?, ?, ?)",
+               (user_id, user_email, message))
+
+def list_feedback_rows(user_id: str):
+    rows = db.fetchall(
+        "SELECT id, user_email, message, created_at FROM feedback WHERE user_id = ? ORDER BY created_at DESC",
+        (user_id,),
+    )
+    return [{"id": r[0], "user_email": r[1], "message": r[2], "created_at": r[3]} for r in rows]
+
 # -------------------------
 # FastAPI App
 # -------------------------
 app = FastAPI(title="Meetly.AI - Gemini Edition")
+app.router.route_class = TimedRoute
 
 origins = [
     # Production frontends
@@ -181,10 +357,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware, server_timing=os.getenv("SERVER_TIMING", "false").lower() == "true")
 
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     init_db()
+    await db.write(job_queue.recover)
+    job_queue.start()
+    email_outbox.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_queue.stop()
+    await email_outbox.stop()
+    for client in llm_clients:
+        client.shutdown()
+    db.close()
+    analysis_cache.db.close()
 
 @app.get("/")
 def root():
@@ -197,6 +386,7 @@ class AnalyzeRequest(BaseModel):
     transcript: str
     title: Optional[str] = "Untitled Meeting"
     date: Optional[str] = None
+    use_cache: Optional[bool] = True
 
 class ActionItem(BaseModel):
     assignee: Optional[str] = None
@@ -210,30 +400,123 @@ class AnalyzeResponse(BaseModel):
     decisions: List[str]
     sentiment: Dict[str, Any]
     meeting_id: Optional[int] = None
+    cached: bool = False
 
-def call_gemini(prompt: str) -> str:
-    print(f"🚀 Sending prompt to Gemini model: {MODEL}")
+async def call_gemini(prompt: str) -> Tuple[str, str]:
+    """The reply text and the name of the model that answered."""
+    log.debug("Sending prompt to Gemini", extra={"model": llm_router.preferred_model(prompt)})
     try:
-        model = genai.GenerativeModel(MODEL)
-        response = model.generate_content(prompt)
-        print("✅ Gemini API responded successfully")
-        return getattr(response, "text", "")
+        with stage("llm"):
+            text, model = await llm_router.generate(prompt)
+        log.debug("Gemini responded", extra={"model": model})
+        return text, model
+    except CircuitOpenError as e:
+        log.warning("Every Gemini model's circuit is open")
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis is temporarily unavailable, please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except LLMBusyError as e:
+        log.warning("Gemini busy", extra={"in_flight": llm_client.in_flight})
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis capacity is saturated, please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
-        print(f"❌ Gemini API call failed: {e}")
+        log.error("Gemini call failed", extra={"error": str(e)})
         raise HTTPException(status_code=500, detail=f"Gemini call failed: {str(e)}")
 
+def llm_busy(e: Exception) -> bool:
+    """True for call_gemini's 503s: no LLM capacity right now, worth waiting for."""
+    return isinstance(e, HTTPException) and e.status_code == 503
+
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "20"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(LLM_MAX_CONCURRENCY)))
+
+analysis_pipeline = AnalysisPipeline(
+    call_gemini,
+    single_call_tokens=int(os.getenv("ANALYSIS_SINGLE_CALL_TOKENS", "8000")),
+    chunk_tokens=int(os.getenv("ANALYSIS_CHUNK_TOKENS", "6000")),
+    map_concurrency=int(os.getenv("ANALYSIS_MAP_CONCURRENCY", str(LLM_MAX_CONCURRENCY))),
+    chunk_retries=int(os.getenv("ANALYSIS_CHUNK_RETRIES", "2")),
+    json_retries=int(os.getenv("ANALYSIS_JSON_RETRIES", "1")),
+    is_busy=llm_busy,
+    busy_timeout=float(os.getenv("ANALYSIS_BUSY_TIMEOUT", "60")),
+)
+
 @app.get("/api/v1/test-secrets")
 def test_secrets():
     """Quick check that secrets are loaded correctly inside Cloud Run."""
     return {
         "GEMINI_API_KEY": bool(os.getenv("GEMINI_API_KEY")),
         "FIREBASE_API_KEY": bool(os.getenv("FIREBASE_API_KEY")),
+        "FIREBASE_PROJECT_ID": bool(os.getenv("FIREBASE_PROJECT_ID")),
+        "FIREBASE_VERIFY_MODE": FIREBASE_VERIFY_MODE,
         "SENDGRID_API_KEY": bool(os.getenv("SENDGRID_API_KEY")),
         "FROM_EMAIL": bool(os.getenv("FROM_EMAIL")),
         "DB_FILE": os.getenv("MEETINGS_DB_PATH", "meetings.db"),
         "PORT": os.getenv("PORT")
     }
 
+def validated_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """`analysis_fields(data)`, raising ValueError unless they form a valid AnalyzeResponse."""
+    fields = analysis_fields(data)
+    AnalyzeResponse(**fields)
+    return fields
+
+# Each streamed item is checked against its AnalyzeResponse field before it is sent.
+STREAM_ITEM_TYPES = {
+    event: TypeAdapter(kind)
+    for event, kind in (("summary", str), ("action_item", ActionItem), ("decision", str), ("sentiment", Dict[str, Any]))
+}
+
+def item_event(event: str, value: Any) -> str:
+    """`sse_event` for one analysis item, raising ValueError if it would not validate."""
+    adapter = STREAM_ITEM_TYPES[event]
+    return sse_event(event, adapter.dump_python(adapter.validate_python(value), mode="json"))
+
+def analysis_cache_keys(transcript: str) -> List[str]:
+    """Cache keys for the models a healthy router would analyze `transcript` with, likeliest first."""
+    primary = llm_router.primary.model_name
+    if estimate_tokens(transcript) <= analysis_pipeline.single_call_tokens:
+        models = [llm_router.preferred_model(ANALYZE_PROMPT.format(transcript=transcript))]
+    else:
+        # Chunks go to the primary; the much shorter reduce prompt may go to the fast tier.
+        models = [primary] + ([model_label([primary, llm_router.fast.model_name])] if llm_router.fast else [])
+    return [cache_key(transcript, model, PROMPT_VERSION) for model in models]
+
+async def run_analysis(transcript: str, use_cache: Optional[bool] = True):
+    """Cached or fresh analysis of a transcript: returns (fields, cache key, cached).
+
+    Replies are validated before they are cached, so callers never store or
+    cache an analysis that cannot be served. A fresh reply is cached under
+    the model that actually answered, so a fallback model's analysis is never
+    served as the preferred model's.
+    """
+    found = await analysis_cache.aget_any(analysis_cache_keys(transcript)) if use_cache is not False else None
+    if found is not None:
+        key, data = found
+        try:
+            fields = validated_fields(data)
+            log.debug("Analysis cache hit", extra={"key": key[:12]})
+            return fields, key, True
+        except ValueError:
+            log.warning("Ignoring invalid cached analysis", extra={"key": key[:12]})
+    try:
+        data, model = await analysis_pipeline.run(transcript)
+    except AnalysisFormatError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    try:
+        fields = validated_fields(data)
+    except ValueError as e:
+        raise HTTPException(status_code=502, detail=f"Invalid analysis: {e}")
+    key = cache_key(transcript, model, PROMPT_VERSION)
+    if data:
+        await analysis_cache.aput(key, model, PROMPT_VERSION, data)
+    return fields, key, False
+
 @app.post("/api/v1/analyze", response_model=AnalyzeResponse)
 async def analyze(req: AnalyzeRequest, user=Depends(verify_firebase_token)):
     transcript = (req.transcript or "").strip()
@@ -241,124 +524,367 @@ async def analyze(req: AnalyzeRequest, user=Depends(verify_firebase_token)):
         raise HTTPException(status_code=400, detail="Transcript is empty.")
     user_email = getattr(req, "user_email", None) or "unknown_user@meetly.ai"
 
-    prompt = f"""
-You are a JSON-only meeting summarizer. Return only JSON in this schema:
-{{
-  "summary": ["point1", "point2"],
-  "action_items": [{{"assignee": null, "task": "example", "due": null, "context": ""}}],
-  "decisions": ["decision1"],
-  "sentiment": {{"sentiment": "neutral", "score": 0.0}}
-}}
-Transcript: {transcript}
-"""
-    import re
-    raw = call_gemini(prompt)
-    cleaned = re.sub(r"```json|```", "", raw)
-    try:
-        data = json.loads(cleaned)
-    except:
-        data = {}
-    summary = data.get("summary", [])
-    actions = data.get("action_items", [])
-    decisions = data.get("decisions", [])
-    sentiment = data.get("sentiment", {"sentiment": "neutral", "score": 0.0})
-
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute(
-        """INSERT INTO meetings (user_id, user_email, title, date, transcript, summary, action_items, decisions, sentiment)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-        (user["uid"], user_email, req.title, req.date, transcript,
-         json.dumps(summary), json.dumps(actions), json.dumps(decisions), json.dumps(sentiment))
+    fields, key, cached = await run_analysis(transcript, req.use_cache)
+    meeting_id = await db.write(save_meeting, user["uid"], user_email, req.title, req.date, transcript, fields, key)
+
+    return AnalyzeResponse(**fields, meeting_id=meeting_id, cached=cached)
+
+# -------------------------
+# Batch analysis
+# -------------------------
+class BatchAnalyzeRequest(BaseModel):
+    items: List[AnalyzeRequest]
+
+@app.post("/api/v1/analyze/batch")
+async def analyze_batch(req: BatchAnalyzeRequest, user=Depends(verify_firebase_token)):
+    """Analyze up to MAX_BATCH_ITEMS transcripts concurrently and store them in one transaction.
+
+    Each input index maps to its `meeting_id`, or to the `error` that item hit;
+    one bad item never fails the rest of the batch.
+    """
+    if not req.items:
+        raise HTTPException(status_code=400, detail="Batch is empty.")
+    if len(req.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ITEMS} items.")
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    transcripts = [(item.transcript or "").strip() for item in req.items]
+
+    async def run_item(i: int):
+        if not transcripts[i]:
+            raise HTTPException(status_code=400, detail="Transcript is empty.")
+        # The pipeline already waits out a saturated LLM limiter (ANALYSIS_BUSY_TIMEOUT).
+        async with semaphore:
+            return await run_analysis(transcripts[i], req.items[i].use_cache)
+
+    outcomes = await asyncio.gather(*(run_item(i) for i in range(len(req.items))), return_exceptions=True)
+
+    results: List[Dict[str, Any]] = [{"index": i} for i in range(len(req.items))]
+    rows, row_indexes = [], []
+    for i, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            results[i]["error"] = getattr(outcome, "detail", None) or str(outcome)
+            continue
+        fields, key, cached = outcome
+        item = req.items[i]
+        user_email = getattr(item, "user_email", None) or "unknown_user@meetly.ai"
+        rows.append(meeting_row(user["uid"], user_email, item.title, item.date, transcripts[i], fields, key))
+        row_indexes.append(i)
+        results[i]["cached"] = cached
+
+    if rows:
+        for i, meeting_id in zip(row_indexes, await db.write(save_meetings, rows)):
+            results[i]["meeting_id"] = meeting_id
+    succeeded = len(rows)
+    log.info("Batch analyzed", extra={"uid": user["uid"], "succeeded": succeeded, "items": len(req.items)})
+    return {"results": results, "succeeded": succeeded, "failed": len(req.items) - succeeded}
+
+# -------------------------
+# Background analysis jobs
+# -------------------------
+async def run_analyze_job(job):
+    fields, key, cached = await run_analysis(job["payload"]["transcript"], job["payload"].get("use_cache"))
+    return {"fields": fields, "key": key, "cached": cached}
+
+def persist_analyze_job(cur, job, result):
+    """Runs in the transaction that completes the job, so a retried job never stores two meetings."""
+    payload = job["payload"]
+    meeting_id = insert_meeting(cur, job["user_id"], payload["user_email"], payload.get("title"),
+                                payload.get("date"), payload["transcript"], result["fields"], result["key"])
+    return AnalyzeResponse(**result["fields"], meeting_id=meeting_id, cached=result["cached"]).model_dump()
+
+job_queue = JobQueue(
+    db,
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "120")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF", "5")),
+    is_busy=llm_busy,
+    busy_retry_delay=LLM_RETRY_AFTER,
+    worker_id=os.getenv("JOB_WORKER_ID"),
+)
+job_queue.register("analyze", run_analyze_job, persist_analyze_job)
+Gauge("meetly_jobs", "Background jobs by status.", ("status",),
+      lambda: {(status,): count for status, count in db.fetchall("SELECT status, COUNT(*) FROM jobs GROUP BY status")})
+Gauge("meetly_jobs_expired_leases", "Running jobs whose worker stopped renewing its lease.",
+      fn=lambda: job_queue.stats()["expired_leases"])
+Gauge("meetly_jobs_oldest_queued_seconds", "Age of the oldest queued job.",
+      fn=lambda: job_queue.stats()["oldest_queued_age_s"])
+
+@app.post("/api/v1/analyze/async", status_code=202)
+async def analyze_async(req: AnalyzeRequest, user=Depends(verify_firebase_token)):
+    """Queue an analysis and return at once; poll /api/v1/jobs/{job_id} for the result."""
+    transcript = (req.transcript or "").strip()
+    if not transcript:
+        raise HTTPException(status_code=400, detail="Transcript is empty.")
+    payload = {
+        "transcript": transcript,
+        "title": req.title,
+        "date": req.date,
+        "use_cache": req.use_cache,
+        "user_email": getattr(req, "user_email", None) or "unknown_user@meetly.ai",
+    }
+    job_id = await job_queue.submit("analyze", user["uid"], payload)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/v1/jobs/{job_id}"}
+
+@app.get("/api/v1/jobs/stats", dependencies=[Depends(require_operator)])
+async def jobs_stats():
+    """Queue depth and job age for sizing JOB_WORKERS; operators only, also on /metrics."""
+    return await db.read(job_queue.stats)
+
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job(job_id: str, user=Depends(verify_firebase_token)):
+    job = await db.read(job_queue.get, job_id, user["uid"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "result": job["result"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+@app.post("/api/v1/analyze/stream")
+async def analyze_stream(req: AnalyzeRequest, user=Depends(verify_firebase_token)):
+    """Server-Sent Events variant of /analyze.
+
+    Emits `summary`, `action_item`, `decision` and `sentiment` events as each
+    one is completed in Gemini's streamed reply and validated, then a final
+    `done` event carrying the result and `meeting_id`. A reply that is cut
+    off, malformed or has an invalid item ends with an `error` event instead
+    and is neither cached nor saved.
+    """
+    transcript = (req.transcript or "").strip()
+    if not transcript:
+        raise HTTPException(status_code=400, detail="Transcript is empty.")
+    user_email = getattr(req, "user_email", None) or "unknown_user@meetly.ai"
+
+    # Long transcripts go through map-reduce and are emitted once it finishes;
+    # short ones are streamed from the router's first healthy model.
+    streamed = estimate_tokens(transcript) <= analysis_pipeline.single_call_tokens
+    found = await analysis_cache.aget_any(analysis_cache_keys(transcript)) if req.use_cache is not False else None
+    key, data = found if found is not None else (None, None)
+    cached = found is not None
+    chunks, model = None, None
+    if not cached and streamed:
+        try:
+            chunks, model = await llm_router.stream(ANALYZE_PROMPT.format(transcript=transcript))
+        except CircuitOpenError as e:
+            log.warning("Every Gemini model's circuit is open")
+            raise HTTPException(
+                status_code=503,
+                detail="Analysis is temporarily unavailable, please retry shortly.",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        except LLMBusyError as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Analysis capacity is saturated, please retry shortly.",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        except Exception as e:
+            log.error("Gemini stream failed", extra={"error": str(e)})
+            raise HTTPException(status_code=500, detail=f"Gemini call failed: {str(e)}")
+
+    async def events():
+        nonlocal data, key, model
+        try:
+            if chunks is not None:
+                log.debug("Streaming prompt to Gemini", extra={"model": model})
+                parser = AnalysisStreamParser()
+                async for text in chunks:
+                    for event, value in parser.feed(text):
+                        try:
+                            item = item_event(event, value)
+                        except ValueError:
+                            # Nothing invalid reaches the client, the cache or the database.
+                            ERRORS.inc(component="analysis", kind="invalid_item")
+                            log.warning("Streamed analysis item failed validation", extra={"model": model, "event": event})
+                            yield sse_event("error", {"detail": "Gemini returned an invalid analysis item."})
+                            return
+                        yield item
+                try:
+                    data = parse_analysis(parser.buffer)
+                except ValueError:
+                    # A cut-off or malformed reply is never cached or saved.
+                    ERRORS.inc(component="analysis", kind="malformed_json")
+                    log.warning("Streamed analysis was not valid JSON", extra={"model": model})
+                    yield sse_event("error", {"detail": "Gemini returned malformed analysis JSON."})
+                    return
+            else:
+                if data is None:
+                    data, model = await analysis_pipeline.run(transcript)
+                for event, value in analysis_events(analysis_fields(data)):
+                    yield item_event(event, value)
+            fields = validated_fields(data)
+            if not cached:
+                key = cache_key(transcript, model, PROMPT_VERSION)
+                if data:
+                    await analysis_cache.aput(key, model, PROMPT_VERSION, data)
+
+            result = AnalyzeResponse(**fields, cached=cached)
+            result.meeting_id = await db.write(
+                save_meeting, user["uid"], user_email, req.title, req.date, transcript, fields, key
+            )
+            yield sse_event("done", result.model_dump())
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            log.error("Streaming analysis failed", extra={"error": str(e)})
+            yield sse_event("error", {"detail": f"Analysis failed: {str(e)}"})
+        finally:
+            if chunks is not None:
+                await chunks.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    con.commit()
-    meeting_id = cur.lastrowid
-    con.close()
 
-    return AnalyzeResponse(summary=summary, action_items=actions, decisions=decisions, sentiment=sentiment, meeting_id=meeting_id)
+@app.get("/api/v1/analysis-cache/stats")
+async def analysis_cache_stats(user=Depends(verify_firebase_token)):
+    """Hit/miss counters for the content-addressed analysis cache."""
+    return await analysis_cache.astats()
 
 # -------------------------
 # Meetings APIs
 # -------------------------
 @app.get("/api/v1/meetings")
-async def api_list_meetings(limit: int = 50, user=Depends(verify_firebase_token)):
-    """Return list of user's meetings."""
-    meetings = list_meetings(user["uid"], limit)
+async def api_list_meetings(limit: int = 50, after: Optional[str] = None, user=Depends(verify_firebase_token)):
+    """Return one page of the user's meetings; pass `next_cursor` back as `after` for the next page."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    meetings, next_cursor = await db.read(list_meetings, user["uid"], limit, decode_cursor(after) if after else None)
+    log.debug("Listed meetings", extra={"uid": user["uid"], "count": len(meetings)})
     if not meetings:
-        print(f"⚠️ No meetings found for user {user['email']} ({user['uid']})")
-        return {"meetings": []}
-    print(f"✅ Found {len(meetings)} meetings for {user['email']}")
-    return {"meetings": meetings}
+        return {"meetings": [], "next_cursor": None}
+    return {"meetings": meetings, "next_cursor": next_cursor}
+
+
+@app.get("/api/v1/meetings/search")
+async def api_search_meetings(q: str, limit: int = 20, offset: int = 0, user=Depends(verify_firebase_token)):
+    """Full-text search over the user's meetings (title, transcript, summary, action items)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    results, next_offset = await db.read(search_meetings, db, user["uid"], q, limit, max(0, offset))
+    return {"results": results, "next_offset": next_offset}
+
+
+@app.get("/api/v1/stats")
+async def api_stats(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    user=Depends(verify_firebase_token),
+):
+    """Dashboard totals and per-day series for `from <= day <= to` (YYYY-MM-DD, UTC)."""
+    try:
+        start = date.fromisoformat(start).isoformat() if start else None
+        end = date.fromisoformat(end).isoformat() if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="`from` and `to` must be YYYY-MM-DD dates.")
+    return await db.read(get_stats, db, user["uid"], start, end)
 
 
 @app.get("/api/v1/meetings/{meeting_id}")
 async def api_get_meeting(meeting_id: int, user=Depends(verify_firebase_token)):
     """Return full meeting details for a specific meeting."""
-    meeting = get_meeting(meeting_id, user["uid"])
+    meeting = await db.read(get_meeting, meeting_id, user["uid"])
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found or access denied.")
-    print(f"✅ Retrieved meeting {meeting_id} for {user['email']}")
+    log.debug("Retrieved meeting", extra={"uid": user["uid"], "meeting_id": meeting_id})
     return meeting
 
 
+# -------------------------
+# Action Items APIs
+# -------------------------
+class ActionItemUpdate(BaseModel):
+    status: Optional[str] = None
+    assignee: Optional[str] = None
+    task: Optional[str] = None
+    due: Optional[str] = None
+
+@app.get("/api/v1/action-items")
+async def api_list_action_items(
+    status: Optional[str] = None,
+    assignee: Optional[str] = None,
+    due_before: Optional[str] = None,
+    due_after: Optional[str] = None,
+    meeting_id: Optional[int] = None,
+    limit: int = 50,
+    offset: int = 0,
+    user=Depends(verify_firebase_token),
+):
+    """The user's action items across all meetings, filtered by status / assignee / due date."""
+    if status is not None and status not in ACTION_ITEM_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(ACTION_ITEM_STATUSES)}.")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    items, next_offset = await db.read(
+        list_action_items, db, user["uid"], status, assignee, due_before, due_after, meeting_id, limit, max(0, offset)
+    )
+    return {"action_items": items, "next_offset": next_offset}
+
+@app.patch("/api/v1/action-items/{item_id}")
+async def api_update_action_item(item_id: int, req: ActionItemUpdate, user=Depends(verify_firebase_token)):
+    """Update an action item's status, assignee, task or due date."""
+    changes = req.model_dump(exclude_unset=True)
+    if "status" in changes and changes["status"] not in ACTION_ITEM_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(ACTION_ITEM_STATUSES)}.")
+    if "task" in changes and not (changes["task"] or "").strip():
+        raise HTTPException(status_code=400, detail="Task cannot be empty.")
+    item = await db.write(update_action_item, db, user["uid"], item_id, changes)
+    if not item:
+        raise HTTPException(status_code=404, detail="Action item not found or access denied.")
+    shared_cache.invalidate_meeting(item["meeting_id"])
+    return item
+
+
 # -------------------------
 # Share Meeting (Generate + Access)
 # -------------------------
 @app.post("/api/v1/share/{meeting_id}")
 async def share_meeting(meeting_id: int, user=Depends(verify_firebase_token)):
     """Generate a unique share token for a meeting."""
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-
-    # Verify ownership
-    cur.execute("SELECT user_id FROM meetings WHERE id = ?", (meeting_id,))
-    row = cur.fetchone()
-    if not row or row[0] != user["uid"]:
-        con.close()
+    token = await db.write(get_or_create_share_token, meeting_id, user["uid"])
+    if not token:
         raise HTTPException(status_code=403, detail="Not allowed to share this meeting.")
-
-    # Create or reuse existing token
-    cur.execute("SELECT share_token FROM meetings WHERE id = ?", (meeting_id,))
-    existing_token = cur.fetchone()
-    if existing_token and existing_token[0]:
-        token = existing_token[0]
-    else:
-        token = str(uuid.uuid4())
-        cur.execute("UPDATE meetings SET share_token = ? WHERE id = ?", (token, meeting_id))
-        con.commit()
-
-    con.close()
     share_url = f"https://meetly-ai-frontend.vercel.app/shared/{token}"
-    print(f"🔗 Generated share link for meeting {meeting_id}: {share_url}")
+    log.info("Generated share link", extra={"uid": user["uid"], "meeting_id": meeting_id})
     return {"share_url": share_url}
 
 
 @app.get("/api/v1/shared/{token}")
-async def get_shared_meeting(token: str):
-    """Retrieve a meeting by its share token (public read-only)."""
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute(
-        "SELECT title, date, summary, action_items, decisions, sentiment, transcript, created_at "
-        "FROM meetings WHERE share_token = ?",
-        (token,),
-    )
-    row = cur.fetchone()
-    con.close()
-
-    if not row:
-        raise HTTPException(status_code=404, detail="Shared meeting not found or expired.")
-
-    return {
-        "title": row[0],
-        "date": row[1],
-        "summary": json.loads(row[2]) if row[2] else [],
-        "action_items": json.loads(row[3]) if row[3] else [],
-        "decisions": json.loads(row[4]) if row[4] else [],
-        "sentiment": json.loads(row[5]) if row[5] else {},
-        "transcript": row[6],
-        "created_at": row[7],
+async def get_shared_meeting(token: str, request: Request, transcript: bool = False):
+    """Retrieve a meeting by its share token (public read-only).
+
+    Served from an in-memory LRU of rendered responses with a strong ETag;
+    `If-None-Match` gets a 304. The transcript is left out unless
+    `?transcript=true`, and large bodies are sent gzip-compressed when the
+    client accepts it, under their own `-gz` ETag.
+    """
+    key = (token, transcript)
+    entry = shared_cache.get(key)
+    if entry is None:
+        found = await db.read(get_shared_meeting_by_token, token, transcript)
+        if not found:
+            raise HTTPException(status_code=404, detail="Shared meeting not found or expired.")
+        with stage("serialize"):
+            entry = shared_cache.put(key, *found)
+
+    gzipped = entry.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": gzip_etag(entry.etag) if gzipped else entry.etag,
+        "Cache-Control": SHARED_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
     }
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry.gzip_body, media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
 
 # -------------------------
 # Feedback APIs
@@ -371,71 +897,84 @@ class FeedbackRequest(BaseModel):
 async def submit_feedback(req: FeedbackRequest, user=Depends(verify_firebase_token)):
     if not req.message.strip():
         raise HTTPException(status_code=400, detail="Feedback message is empty.")
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute("INSERT INTO feedback (user_id, user_email, message) VALUES (?, ?, ?)",
-                (user["uid"], req.user_email, req.message))
-    con.commit()
-    con.close()
+    await db.write(save_feedback, user["uid"], req.user_email, req.message)
     return {"status": "success", "message": "Feedback received successfully."}
 
 @app.get("/api/v1/feedbacks")
 async def list_feedback(user=Depends(verify_firebase_token)):
-    con = sqlite3.connect(DB_FILE)
-    cur = con.cursor()
-    cur.execute("SELECT id, user_email, message, created_at FROM feedback WHERE user_id = ? ORDER BY created_at DESC",
-                (user["uid"],))
-    rows = cur.fetchall()
-    con.close()
-    return [{"id": r[0], "user_email": r[1], "message": r[2], "created_at": r[3]} for r in rows]
+    return await db.read(list_feedback_rows, user["uid"])
 
 # -------------------------
 # OTP Email (2FA)
 # -------------------------
-otp_store = {}
-otp_lock = Lock()
+OTP_STORE = os.getenv("OTP_STORE", "sqlite").lower()  # "sqlite" (shared by all workers) or "memory"
+# Reverse proxies in front of the app that append to X-Forwarded-For (0 = use the socket peer).
+# TRUST_FORWARDED_FOR=true is the older spelling of a single proxy.
+TRUSTED_PROXY_HOPS = int(os.getenv(
+    "TRUSTED_PROXY_HOPS", "1" if os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true" else "0"
+))
+
+otp_store = (
+    MemoryTTLStore(max_entries=int(os.getenv("OTP_MEMORY_MAX_ENTRIES", "100000")))
+    if OTP_STORE == "memory" else SQLiteTTLStore(db)
+)
+otp_manager = OTPManager(
+    otp_store,
+    ttl=float(os.getenv("OTP_TTL_SECONDS", "300")),
+    max_attempts=int(os.getenv("OTP_MAX_ATTEMPTS", "5")),
+    email_limit=int(os.getenv("OTP_EMAIL_LIMIT", "5")),
+    ip_limit=int(os.getenv("OTP_IP_LIMIT", "20")),
+    window=float(os.getenv("OTP_RATE_WINDOW_SECONDS", "3600")),
+)
+
+SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
+email_outbox = EmailOutbox(
+    db,
+    SendGridSender(
+        SENDGRID_API_KEY,
+        os.getenv("FROM_EMAIL", "no-reply@meetly.ai"),
+        api_url=os.getenv("SENDGRID_API_URL", SENDGRID_API_URL),
+    ) if SENDGRID_API_KEY else None,
+    batch_size=int(os.getenv("EMAIL_BATCH_SIZE", "100")),
+    max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", "5")),
+    retry_backoff=float(os.getenv("EMAIL_RETRY_BACKOFF", "5")),
+)
+Gauge("meetly_email_outbox_messages", "Email outbox messages by delivery status.", ("status",),
+      lambda: {(k,): v for k, v in email_outbox.stats().items() if k != "oldest_queued_age_s"})
+Gauge("meetly_email_outbox_oldest_queued_seconds", "Age of the oldest queued email.",
+      fn=lambda: email_outbox.stats()["oldest_queued_age_s"])
+
+def client_ip(request: Request) -> Optional[str]:
+    """Caller address as seen by the outermost of TRUSTED_PROXY_HOPS proxies.
+
+    Each proxy appends the peer it received the request from, so only the
+    rightmost TRUSTED_PROXY_HOPS entries of X-Forwarded-For were written by
+    infrastructure we control; anything to their left is client supplied.
+    A request carrying fewer entries did not come through the proxies and is
+    keyed on its socket peer.
+    """
+    peer = request.client.host if request.client else None
+    if TRUSTED_PROXY_HOPS <= 0:
+        return peer
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    return hops[-TRUSTED_PROXY_HOPS] if len(hops) >= TRUSTED_PROXY_HOPS else peer
 
 @app.post("/api/v1/send_otp")
-async def send_otp(payload: dict):
+async def send_otp(payload: dict, request: Request):
     email = payload.get("email")
     if not email:
         raise HTTPException(status_code=400, detail="Email required.")
 
-    otp_code = str(random.randint(100000, 999999))
-    expiry = time.time() + 300
-
-    with otp_lock:
-        otp_store[email] = {"otp": otp_code, "expires_at": expiry}
-
-    # Send Email via SendGrid
-    sg_api_key = os.getenv("SENDGRID_API_KEY")
-    from_email = os.getenv("FROM_EMAIL", "no-reply@meetly.ai")
+    try:
+        otp_code = await otp_manager.issue(email, client_ip(request))
+    except OTPRateLimitedError as e:
+        log.warning("OTP rate limit hit", extra={"ip": client_ip(request)})
+        raise HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
 
-    if sg_api_key:
-        try:
-            sg = sendgrid.SendGridAPIClient(api_key=sg_api_key)
-            message = Mail(
-                from_email=from_email,
-                to_emails=email,
-                subject="🔐 Your Meetly.AI OTP Code",
-                html_content=f"""
-                <div style="font-family: Arial, sans-serif; color: #111;">
-                  <h2>🔑 Meetly.AI Login Verification</h2>
-                  <p>Your One-Time Password (OTP) is:</p>
-                  <h1 style="color:#4F46E5; letter-spacing: 3px;">{otp_code}</h1>
-                  <p>This code is valid for <b>5 minutes</b>. If you didn’t request it, please ignore this email.</p>
-                  <br/>
-                  <p>– The Meetly.AI Team</p>
-                </div>
-                """
-            )
-            sg.send(message)
-            print(f"📧 OTP email sent to {email}")
-        except Exception as e:
-            print(f"❌ Failed to send OTP email via SendGrid: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to send OTP email")
+    if email_outbox.sender is None:
+        log.warning("SENDGRID_API_KEY missing; OTP email not sent")
     else:
-        print("⚠️ Missing SENDGRID_API_KEY – email not sent.")
+        await email_outbox.submit("otp", email, {"code": otp_code, "minutes": int(otp_manager.ttl // 60)})
 
     return {"status": "success", "message": f"OTP sent to {email}"}
 
@@ -444,18 +983,29 @@ async def verify_otp(payload: dict):
     email, otp_input = payload.get("email"), payload.get("otp")
     if not email or not otp_input:
         raise HTTPException(status_code=400, detail="Email and OTP required.")
-    with otp_lock:
-        entry = otp_store.get(email)
-        if not entry:
-            raise HTTPException(status_code=400, detail="No OTP found for this email.")
-        if time.time() > entry["expires_at"]:
-            del otp_store[email]
-            raise HTTPException(status_code=400, detail="OTP expired.")
-        if entry["otp"] != str(otp_input):
-            raise HTTPException(status_code=400, detail="Invalid OTP.")
-        del otp_store[email]
+    try:
+        await otp_manager.verify(email, str(otp_input))
+    except OTPError as e:
+        raise HTTPException(status_code=400, detail=e.detail)
     return {"status": "success", "message": "OTP verified successfully."}
 
+@app.get("/api/v1/email-outbox/stats", dependencies=[Depends(require_operator)])
+async def email_outbox_stats():
+    """Delivery state of the email outbox (operators only; also exported on /metrics)."""
+    return await db.read(email_outbox.stats)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str = Header(None)):
+    """Prometheus text exposition; requires `Bearer $METRICS_TOKEN` when that is set."""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token.")
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/api/v1/llm/stats")
+async def llm_stats(user=Depends(verify_firebase_token)):
+    """Per-model circuit state, latency percentiles and hedge counters."""
+    return llm_router.stats()
+
 # -------------------------
 # Run Server
 # -------------------------
@@ -0,0 +1,46 @@
+# manage.py – One-off maintenance commands for the Meetly.AI database
+#
+#   python manage.py migrate
+#   python manage.py backfill-search [--batch 1000]
+#   python manage.py rebuild-stats [--check]
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+from logs import setup_logging
+from search import backfill_search_index
+from stats import rebuild_stats
+from storage import MIGRATIONS, Database
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meetly.AI maintenance commands")
+    parser.add_argument("--db", default=os.getenv("MEETINGS_DB_PATH", "meetings.db"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="apply pending schema migrations")
+    backfill = sub.add_parser("backfill-search", help="re-index meetings missing from full-text search")
+    backfill.add_argument("--batch", type=int, default=1000)
+    rebuild = sub.add_parser("rebuild-stats", help="recompute dashboard rollups from meetings")
+    rebuild.add_argument("--check", action="store_true", help="only report drift, do not rewrite")
+    args = parser.parse_args()
+
+    setup_logging(os.getenv("LOG_LEVEL", "INFO"), "text")
+    db = Database(args.db)
+    version = db.migrate(MIGRATIONS)
+    if args.command == "migrate":
+        print(f"✅ Schema at version {version}")
+    elif args.command == "backfill-search":
+        print(f"✅ Indexed {backfill_search_index(db, args.batch)} meetings")
+    elif args.command == "rebuild-stats":
+        result = rebuild_stats(db, check_only=args.check)
+        action = "found" if args.check else "repaired"
+        print(f"✅ {result['rows']} rollup rows; {action} {result['drifted']} drifted")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# otp.py – One-time passcodes with rate-limited issuance and capped verify attempts
+import hmac
+import math
+import secrets
+import time
+from typing import Optional
+
+from ttl_store import TTLStore
+
+
+class OTPError(Exception):
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class OTPRateLimitedError(OTPError):
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+class OTPManager:
+    """Issues and checks 6-digit codes kept in a `TTLStore`.
+
+    Issuance is limited per email and per client IP with fixed-window
+    counters, and each code accepts at most `max_attempts` guesses before it
+    is burned, so neither memory nor outgoing mail grows with abusive traffic.
+    """
+
+    def __init__(
+        self,
+        store: TTLStore,
+        ttl: float = 300,
+        max_attempts: int = 5,
+        email_limit: int = 5,
+        ip_limit: int = 20,
+        window: float = 3600,
+    ):
+        self.store = store
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.email_limit = email_limit
+        self.ip_limit = ip_limit
+        self.window = window
+
+    async def _limit(self, key: str, limit: int) -> None:
+        count, expires_at = await self.store.aincr(key, self.window)
+        if count > limit:
+            raise OTPRateLimitedError("Too many OTP requests. Try again later.", max(1, math.ceil(expires_at - time.time())))
+
+    async def issue(self, email: str, ip: Optional[str] = None) -> str:
+        email = email.strip().lower()
+        # IP first: a blocked client must not spend the victim's per-email budget.
+        if ip:
+            await self._limit(f"otp-rate:ip:{ip}", self.ip_limit)
+        await self._limit(f"otp-rate:email:{email}", self.email_limit)
+        code = str(100000 + secrets.randbelow(900000))
+        await self.store.aset(f"otp:{email}", code, self.ttl)
+        await self.store.adelete(f"otp-attempts:{email}")
+        return code
+
+    async def verify(self, email: str, code: str) -> None:
+        email = email.strip().lower()
+        key, attempts_key = f"otp:{email}", f"otp-attempts:{email}"
+        attempts, _ = await self.store.aincr(attempts_key, self.ttl)
+        if attempts > self.max_attempts:
+            await self.store.adelete(key)
+            raise OTPError("Too many attempts. Request a new OTP.")
+        expected = await self.store.aget(key)
+        if expected is None:
+            raise OTPError("No valid OTP found for this email. It may have expired.")
+        if not hmac.compare_digest(str(expected), str(code).strip()):
+            raise OTPError("Invalid OTP.")
+        # Only one concurrent verification may consume the code.
+        if await self.store.apop(key) is None:
+            raise OTPError("No valid OTP found for this email. It may have expired.")
+        await self.store.adelete(attempts_key)
@@ -0,0 +1,270 @@
+# outbox.py – Durable email outbox with a batching SendGrid sender
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from metrics import ERRORS
+from storage import Database
+
+log = logging.getLogger(__name__)
+
+SENDGRID_API_URL = "https://api.sendgrid.com/v3/mail/send"
+# SendGrid accepts up to 1000 personalizations per request.
+SENDGRID_MAX_BATCH = 1000
+
+
+@dataclass(frozen=True)
+class EmailTemplate:
+    """Subject and HTML built once, with `-name-` tags filled per recipient.
+
+    The tags are SendGrid substitution tags, so one API call can carry many
+    recipients that share the template but not its parameters.
+    """
+
+    name: str
+    subject: str
+    html: str
+
+
+OTP_TEMPLATE = EmailTemplate(
+    name="otp",
+    subject="🔐 Your Meetly.AI OTP Code",
+    html="""
+<div style="font-family: Arial, sans-serif; color: #111;">
+  <h2>🔑 Meetly.AI Login Verification</h2>
+  <p>Your One-Time Password (OTP) is:</p>
+  <h1 style="color:#4F46E5; letter-spacing: 3px;">-code-</h1>
+  <p>This code is valid for <b>-minutes- minutes</b>. If you didn’t request it, please ignore this email.</p>
+  <br/>
+  <p>– The Meetly.AI Team</p>
+</div>
+""",
+)
+TEMPLATES = {t.name: t for t in (OTP_TEMPLATE,)}
+
+
+class SendError(Exception):
+    def __init__(self, detail: str, retryable: bool = True):
+        super().__init__(detail)
+        self.retryable = retryable
+
+
+class SendGridSender:
+    """Posts to the v3 mail/send API over one keep-alive `requests.Session`."""
+
+    def __init__(self, api_key: str, from_email: str, api_url: str = SENDGRID_API_URL, timeout: float = 10.0):
+        self.from_email = from_email
+        self.api_url = api_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+
+    def send_batch(self, template: EmailTemplate, messages: List[Dict[str, Any]]) -> None:
+        """One request delivering `template` to every message's recipient with its own parameters."""
+        body = {
+            "from": {"email": self.from_email},
+            "subject": template.subject,
+            "content": [{"type": "text/html", "value": template.html}],
+            "personalizations": [
+                {
+                    "to": [{"email": m["to_email"]}],
+                    "substitutions": {f"-{k}-": str(v) for k, v in m["params"].items()},
+                }
+                for m in messages
+            ],
+        }
+        try:
+            res = self.session.post(self.api_url, data=json.dumps(body), timeout=self.timeout)
+        except requests.RequestException as e:
+            raise SendError(f"SendGrid request failed: {e}")
+        if res.status_code >= 300:
+            retryable = res.status_code == 429 or res.status_code >= 500
+            raise SendError(f"SendGrid responded {res.status_code}: {res.text[:200]}", retryable)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+OUTBOX_FIELDS = ["id", "template", "to_email", "params", "attempts", "max_attempts"]
+
+
+class EmailOutbox:
+    """Messages are written to `email_outbox` by handlers and delivered by one background sender.
+
+    The sender leases a batch of due messages, sends them grouped by template
+    (one API call per group), and records `sent` or retries with exponential
+    backoff until `max_attempts`, after which the message is `failed`. Leases
+    let another worker pick up batches from a process that died mid-send.
+    Parameters (such as OTP codes) are cleared once a message is settled.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        sender: Optional[SendGridSender],
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        max_attempts: int = 5,
+        retry_backoff: float = 5.0,
+        lease_seconds: float = 60,
+    ):
+        self.db = db
+        self.sender = sender
+        self.batch_size = min(batch_size, SENDGRID_MAX_BATCH)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = lease_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # -------------------------
+    # Sync operations (run on the db threads)
+    # -------------------------
+    def enqueue(self, template: str, to_email: str, params: Dict[str, Any]) -> int:
+        now = time.time()
+        cur = self.db.execute(
+            """INSERT INTO email_outbox (template, to_email, params, status, attempts, max_attempts,
+                                         next_attempt_at, created_at, updated_at)
+               VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?)""",
+            (template, to_email, json.dumps(params), self.max_attempts, now, now, now),
+        )
+        return cur.lastrowid
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Lease up to `limit` due messages (or ones whose sender's lease ran out)."""
+        now = time.time()
+        with self.db.transaction() as cur:
+            # A sender that died on its final attempt leaves the row leased; settle it
+            # instead of retrying forever with the parameters (OTP codes) still stored.
+            cur.execute(
+                """UPDATE email_outbox SET status = 'failed', params = NULL, lease_expires_at = NULL,
+                       last_error = coalesce(last_error, 'Lease expired on final attempt'), updated_at = ?
+                   WHERE status = 'sending' AND lease_expires_at < ? AND attempts >= max_attempts""",
+                (now, now),
+            )
+            rows = cur.execute(
+                f"""SELECT {", ".join(OUTBOX_FIELDS)} FROM email_outbox
+                    WHERE (status = 'queued' AND next_attempt_at <= ?)
+                       OR (status = 'sending' AND lease_expires_at < ?)
+                    ORDER BY next_attempt_at LIMIT ?""",
+                (now, now, limit),
+            ).fetchall()
+            cur.executemany(
+                """UPDATE email_outbox SET status = 'sending', attempts = attempts + 1,
+                       lease_expires_at = ?, updated_at = ? WHERE id = ?""",
+                [(now + self.lease_seconds, now, row[0]) for row in rows],
+            )
+        messages = [dict(zip(OUTBOX_FIELDS, row)) for row in rows]
+        for m in messages:
+            m["params"] = json.loads(m["params"]) if m["params"] else {}
+            m["attempts"] += 1
+        return messages
+
+    def mark_sent(self, ids: List[int]) -> None:
+        now = time.time()
+        with self.db.transaction() as cur:
+            cur.executemany(
+                """UPDATE email_outbox SET status = 'sent', params = NULL, last_error = NULL,
+                       lease_expires_at = NULL, sent_at = ?, updated_at = ? WHERE id = ?""",
+                [(now, now, i) for i in ids],
+            )
+
+    def mark_failed(self, messages: List[Dict[str, Any]], error: str, retryable: bool) -> None:
+        now = time.time()
+        retries, failures = [], []
+        for m in messages:
+            if retryable and m["attempts"] < m["max_attempts"]:
+                retries.append((now + self.retry_backoff * (2 ** (m["attempts"] - 1)), error[:2000], now, m["id"]))
+            else:
+                failures.append((error[:2000], now, m["id"]))
+        with self.db.transaction() as cur:
+            cur.executemany(
+                """UPDATE email_outbox SET status = 'queued', next_attempt_at = ?, last_error = ?,
+                       lease_expires_at = NULL, updated_at = ? WHERE id = ?""",
+                retries,
+            )
+            cur.executemany(
+                """UPDATE email_outbox SET status = 'failed', params = NULL, last_error = ?,
+                       lease_expires_at = NULL, updated_at = ? WHERE id = ?""",
+                failures,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self.db.fetchall("SELECT status, COUNT(*) FROM email_outbox GROUP BY status"))
+        oldest = self.db.fetchone("SELECT MIN(created_at) FROM email_outbox WHERE status = 'queued'")[0]
+        return {
+            "queued": counts.get("queued", 0),
+            "sending": counts.get("sending", 0),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_queued_age_s": round(time.time() - oldest, 1) if oldest else 0.0,
+        }
+
+    # -------------------------
+    # Async API
+    # -------------------------
+    async def submit(self, template: str, to_email: str, params: Dict[str, Any]) -> int:
+        if template not in TEMPLATES:
+            raise ValueError(f"Unknown email template {template!r}")
+        message_id = await self.db.write(self.enqueue, template, to_email, params)
+        if self._wakeup:
+            self._wakeup.set()
+        return message_id
+
+    def start(self) -> None:
+        if self._task or self.sender is None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        log.info("Email outbox sender started", extra={"batch_size": self.batch_size})
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.sender:
+            self.sender.close()
+
+    async def _run(self) -> None:
+        while True:
+            messages = await self.db.write(self.claim, self.batch_size)
+            if not messages:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            groups: Dict[str, List[Dict[str, Any]]] = {}
+            for m in messages:
+                groups.setdefault(m["template"], []).append(m)
+            for name, group in groups.items():
+                await self._deliver(TEMPLATES.get(name), group)
+
+    async def _deliver(self, template: Optional[EmailTemplate], messages: List[Dict[str, Any]]) -> None:
+        if template is None:
+            await self.db.write(self.mark_failed, messages, "Unknown email template", False)
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.sender.send_batch, template, messages)
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)
+            if not retryable and len(messages) > 1:
+                # One bad recipient rejects the whole request; send individually to isolate it.
+                for m in messages:
+                    await self._deliver(template, [m])
+                return
+            ERRORS.inc(component="email", kind="retryable" if retryable else "rejected")
+            log.error("Email batch failed", extra={"messages": len(messages), "error": str(e), "retryable": retryable})
+            await self.db.write(self.mark_failed, messages, str(e), retryable)
+            return
+        await self.db.write(self.mark_sent, [m["id"] for m in messages])
+        log.info("Sent emails", extra={"messages": len(messages), "template": template.name})
@@ -0,0 +1,82 @@
+# search.py – Full-text search over meetings (SQLite FTS5)
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import Database, index_meetings
+
+log = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = "{title transcript summary_text action_text}"
+# bm25 weights, in meetings_fts column order: title, transcript, summary_text, action_text, user_id
+BM25_WEIGHTS = "10.0, 1.0, 4.0, 4.0, 0.0"
+# Shortest last word searched as a prefix (meetings_fts keeps prefix indexes for 2-4 characters).
+MIN_PREFIX_CHARS = 3
+
+
+def build_match_query(user_id: str, q: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query narrowed to one user's rows.
+
+    Every word becomes a quoted term, so user input can never inject FTS5
+    syntax. The last one also matches as a prefix once it has
+    MIN_PREFIX_CHARS characters; shorter prefixes match too many terms.
+    The tokenized `user_id` column is only a prefilter: different uids can
+    share tokens ("team-1", "TEAM_1"), so callers must also compare
+    `meetings.user_id` exactly.
+    """
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    if len(terms[-1]) >= MIN_PREFIX_CHARS:
+        quoted[-1] += "*"
+    uid = user_id.replace('"', '""')
+    return f'user_id : "{uid}" AND {SEARCH_COLUMNS} : ({" ".join(quoted)})'
+
+
+def search_meetings(db: Database, user_id: str, q: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """BM25-ranked page of the user's meetings matching `q`, plus the next offset."""
+    match = build_match_query(user_id, q)
+    if not match:
+        return [], None
+    rows = db.fetchall(
+        f"""SELECT m.id, m.title, m.date, m.created_at,
+                   highlight(meetings_fts, 0, '<mark>', '</mark>'),
+                   snippet(meetings_fts, -1, '<mark>', '</mark>', '…', 16),
+                   bm25(meetings_fts, {BM25_WEIGHTS}) AS score
+            FROM meetings_fts JOIN meetings m ON m.id = meetings_fts.rowid
+            WHERE meetings_fts MATCH ? AND m.user_id = ?
+            ORDER BY score LIMIT ? OFFSET ?""",
+        (match, user_id, limit + 1, offset),
+    )
+    results = [
+        {
+            "id": r[0],
+            "title": r[1],
+            "date": r[2],
+            "created_at": r[3],
+            "title_highlight": r[4],
+            "snippet": r[5],
+            "score": round(-r[6], 4),
+        }
+        for r in rows[:limit]
+    ]
+    return results, (offset + limit if len(rows) > limit else None)
+
+
+def backfill_search_index(db: Database, batch: int = 1000) -> int:
+    """Index meetings rows missing from meetings_fts, one transaction per batch.
+
+    Migrations already index existing rows; this repairs an index that was
+    dropped or emptied by hand.
+    """
+    indexed, last_id = 0, 0
+    while True:
+        ids = db.fetchall("SELECT id FROM meetings WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch))
+        if not ids:
+            return indexed
+        lo, hi = ids[0][0], ids[-1][0]
+        with db.transaction() as cur:
+            indexed += index_meetings(cur, lo, hi)
+        last_id = hi
+        log.info("Indexed meetings", extra={"up_to_id": hi, "indexed": indexed})
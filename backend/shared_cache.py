@@ -0,0 +1,117 @@
+# shared_cache.py – LRU of rendered public shared-meeting responses
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Set
+
+# Bodies smaller than this are not worth a gzip round trip.
+GZIP_MIN_BYTES = 1024
+GZIP_ETAG_SUFFIX = "-gz"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
+    meeting_id: int
+    expires_at: float
+
+
+def render_json(payload: Dict[str, Any]) -> bytes:
+    """Same bytes Starlette's JSONResponse would produce."""
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def gzip_etag(etag: str) -> str:
+    """The tag of the gzip-encoded representation: the body's tag with a `-gz` suffix."""
+    return etag[:-1] + GZIP_ETAG_SUFFIX + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """`If-None-Match` check (weak comparison, as RFC 9110 requires for GET).
+
+    Either representation's tag matches: both encode the same JSON, so a
+    client revalidating a gzip copy may get a 304 for the identity one.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag in tags or gzip_etag(etag) in tags
+
+
+class SharedMeetingCache:
+    """Rendered responses for /api/v1/shared/{token}, keyed by (token, variant).
+
+    Each entry keeps the JSON body, a gzip copy and a strong ETag computed
+    once (the gzip copy is served as `gzip_etag(etag)`), so a hot link is served without touching SQLite. Entries are
+    dropped when their meeting changes in this process (`invalidate_meeting`)
+    and expire after `ttl` seconds, which bounds staleness for changes made
+    by other workers. Only used from the event loop, so no locking.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._by_meeting: Dict[int, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= self._clock():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, meeting_id: int, payload: Dict[str, Any]) -> CachedResponse:
+        body = render_json(payload)
+        entry = CachedResponse(
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            meeting_id=meeting_id,
+            expires_at=self._clock() + self.ttl,
+        )
+        if self.maxsize <= 0:
+            return entry
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = entry
+        self._by_meeting.setdefault(meeting_id, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+        return entry
+
+    def invalidate_meeting(self, meeting_id: int) -> None:
+        for key in list(self._by_meeting.get(meeting_id, ())):
+            self._drop(key)
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_meeting.get(entry.meeting_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_meeting[entry.meeting_id]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
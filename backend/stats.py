@@ -0,0 +1,69 @@
+# stats.py – Dashboard statistics served from the meeting_stats_daily rollup
+from typing import Any, Dict, List, Optional
+
+from storage import STATS_COLUMNS, Database, stats_rollup_select
+
+STATS_SELECT = ", ".join(STATS_COLUMNS)
+
+
+def _summarize(counts: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meetings": counts["meetings"],
+        "action_items": counts["action_items"],
+        "decisions": counts["decisions"],
+        "sentiment": {
+            "positive": counts["positive"],
+            "neutral": counts["neutral"],
+            "negative": counts["negative"],
+            "average_score": round(counts["score_sum"] / counts["scored"], 3) if counts["scored"] else None,
+        },
+    }
+
+
+def get_stats(db: Database, user_id: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    """Totals and a per-day series for `start <= day <= end` (ISO dates, both optional).
+
+    Reads one rollup row per active day from the (user_id, day) primary key,
+    so the cost depends on the range, never on how many meetings it covers.
+    """
+    rows = db.fetchall(
+        f"SELECT day, {STATS_SELECT} FROM meeting_stats_daily "
+        "WHERE user_id = ? AND day >= coalesce(?, '') AND day <= coalesce(?, '9999-12-31') ORDER BY day",
+        (user_id, start, end),
+    )
+    totals = dict.fromkeys(STATS_COLUMNS, 0)
+    days: List[Dict[str, Any]] = []
+    for row in rows:
+        counts = dict(zip(STATS_COLUMNS, row[1:]))
+        for column in STATS_COLUMNS:
+            totals[column] += counts[column]
+        days.append({"day": row[0], **_summarize(counts)})
+    return {"from": start, "to": end, "totals": _summarize(totals), "days": days}
+
+
+def rebuild_stats(db: Database, check_only: bool = False) -> Dict[str, int]:
+    """Recompute meeting_stats_daily from `meetings`.
+
+    Returns the number of rollup rows and how many of them had drifted from
+    the recomputed values; with `check_only` the table is left untouched.
+    """
+    columns = f"user_id, day, {STATS_SELECT}"
+    compared = columns.replace("score_sum", "round(score_sum, 6)")
+    with db.transaction() as cur:
+        cur.execute("DROP TABLE IF EXISTS temp.stats_rebuild")
+        cur.execute(f"CREATE TEMP TABLE stats_rebuild ({columns})")
+        cur.execute(f"INSERT INTO stats_rebuild ({columns}) {stats_rollup_select()}")
+        drifted = cur.execute(
+            f"""SELECT COUNT(*) FROM (
+                    SELECT user_id, day FROM (SELECT {compared} FROM stats_rebuild
+                                              EXCEPT SELECT {compared} FROM meeting_stats_daily)
+                    UNION
+                    SELECT user_id, day FROM (SELECT {compared} FROM meeting_stats_daily
+                                              EXCEPT SELECT {compared} FROM stats_rebuild))"""
+        ).fetchone()[0]
+        rows = cur.execute("SELECT COUNT(*) FROM stats_rebuild").fetchone()[0]
+        if drifted and not check_only:
+            cur.execute("DELETE FROM meeting_stats_daily")
+            cur.execute(f"INSERT INTO meeting_stats_daily ({columns}) SELECT {columns} FROM stats_rebuild")
+        cur.execute("DROP TABLE stats_rebuild")
+    return {"rows": rows, "drifted": drifted}
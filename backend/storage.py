@@ -0,0 +1,571 @@
+# storage.py – Pooled SQLite access layer and schema migrations for Meetly.AI
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from metrics import stage
+
+log = logging.getLogger(__name__)
+
+Migration = Tuple[int, str, Union[str, Callable[[sqlite3.Cursor], None]]]
+
+
+class Database:
+    """Long-lived per-thread SQLite connections in WAL mode.
+
+    Reads run on a small reader pool and writes on a single writer thread, so
+    blocking sqlite calls never run on the event loop and writers in this
+    process never contend for the database lock with each other. Each
+    connection keeps its own LRU of prepared statements (`cached_statements`).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        readers: int = 4,
+        busy_timeout: float = 5.0,
+        cached_statements: int = 256,
+    ):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._reader = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened and configured on first use."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                cached_statements=self.cached_statements,
+            )
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            con.execute("PRAGMA foreign_keys=ON")
+            self._local.con = con
+            with self._connections_lock:
+                self._connections.append(con)
+        return con
+
+    # -------------------------
+    # Sync helpers (call from reader / writer threads)
+    # -------------------------
+    def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        return self.connection().execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        return self.connection().execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """`BEGIN IMMEDIATE` ... `COMMIT`, rolled back if the block raises."""
+        con = self.connection()
+        cur = con.cursor()
+        if not con.in_transaction:
+            cur.execute("BEGIN IMMEDIATE")
+        try:
+            yield cur
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+        finally:
+            cur.close()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        """Run one write statement in its own transaction; returns the cursor."""
+        with self.transaction() as cur:
+            cur.execute(sql, params)
+            return cur
+
+    # -------------------------
+    # Async entry points (call from handlers)
+    # -------------------------
+    async def read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with stage("db_read"):
+            return await asyncio.get_running_loop().run_in_executor(self._reader, fn, *args)
+
+    async def write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with stage("db_write"):
+            return await asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+
+    # -------------------------
+    # Schema migrations
+    # -------------------------
+    def migrate(self, migrations: Sequence[Migration], lock_timeout: float = 600.0) -> int:
+        """Apply migrations newer than `PRAGMA user_version`, each in its own transaction.
+
+        The version is re-read after `BEGIN IMMEDIATE` takes the write lock, so
+        workers starting together apply each migration exactly once; the others
+        wait up to `lock_timeout` seconds for a long backfill to finish.
+        """
+        con = self.connection()
+        con.execute(f"PRAGMA busy_timeout={int(lock_timeout * 1000)}")
+        try:
+            current = con.execute("PRAGMA user_version").fetchone()[0]
+            for version, name, step in sorted(migrations, key=lambda m: m[0]):
+                if version <= current:
+                    continue
+                with self.transaction() as cur:
+                    current = cur.execute("PRAGMA user_version").fetchone()[0]
+                    if version <= current:
+                        continue
+                    if callable(step):
+                        step(cur)
+                    else:
+                        for statement in split_statements(step):
+                            cur.execute(statement)
+                    cur.execute(f"PRAGMA user_version = {int(version)}")
+                log.info("Applied migration", extra={"version": version, "migration": name})
+                current = version
+            return current
+        finally:
+            con.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+
+    def close(self) -> None:
+        self._reader.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        with self._connections_lock:
+            for con in self._connections:
+                try:
+                    con.close()
+                except sqlite3.ProgrammingError:
+                    # Connections owned by other threads cannot be closed from here.
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def split_statements(script: str) -> List[str]:
+    """Split a SQL script on `;`, keeping trigger bodies (BEGIN ... END) intact."""
+    statements, buffer = [], ""
+    for piece in script.split(";"):
+        buffer += piece + ";"
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip(" \t\n;"):
+                statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip(" \t\n;"):
+        statements.append(buffer.strip())
+    return statements
+
+
+def column_names(cur: sqlite3.Cursor, table: str) -> List[str]:
+    return [row[1] for row in cur.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def add_column(cur: sqlite3.Cursor, table: str, column: str, decl: str) -> None:
+    """`ALTER TABLE ... ADD COLUMN` that tolerates databases which already have it."""
+    if column not in column_names(cur, table):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+# -------------------------
+# meetings.db schema
+# -------------------------
+def fts_row_values(row: str, items_table: bool = True) -> str:
+    """SQL expressions producing a meetings_fts row from meetings alias `row`.
+
+    Action-item text comes from the action_items table; `items_table=False`
+    is the JSON-column form migrations 5 and 7 were written with.
+    """
+    if items_table:
+        action_text = f"""(SELECT group_concat(coalesce(a.assignee || ' ', '') || a.task, ' ')
+             FROM action_items a WHERE a.meeting_id = {row}.id)"""
+    else:
+        action_text = f"""CASE WHEN json_valid({row}.action_items) THEN
+            (SELECT group_concat(coalesce(json_extract(value, '$.assignee') || ' ', '') || json_extract(value, '$.task'), ' ')
+             FROM json_each({row}.action_items) WHERE type = 'object') END"""
+    return f"""{row}.id, {row}.title, {row}.transcript,
+        CASE WHEN json_valid({row}.summary) THEN
+            (SELECT group_concat(value, ' ') FROM json_each({row}.summary) WHERE type = 'text') END,
+        {action_text},
+        {row}.user_id"""
+
+
+FTS_COLUMNS = "rowid, title, transcript, summary_text, action_text, user_id"
+
+
+# Per-user, per-day dashboard counters. Each value is an SQL expression over a
+# meetings row alias; the triggers in migration 7 add / subtract them.
+STATS_COLUMNS = ["meetings", "positive", "neutral", "negative", "score_sum", "scored", "action_items", "decisions"]
+
+
+def _sentiment_is(row: str, labels: str) -> str:
+    return f"""CASE WHEN json_valid({row}.sentiment) THEN
+            CASE WHEN lower(json_extract({row}.sentiment, '$.sentiment')) IN ({labels}) THEN 1 ELSE 0 END
+        ELSE 0 END"""
+
+
+def _json_score(row: str, value: str) -> str:
+    return f"""CASE WHEN json_valid({row}.sentiment) THEN
+            CASE WHEN json_type({row}.sentiment, '$.score') IN ('integer', 'real') THEN {value} ELSE 0 END
+        ELSE 0 END"""
+
+
+def _json_length(row: str, column: str) -> str:
+    return f"""CASE WHEN json_valid({row}.{column}) THEN
+            CASE WHEN json_type({row}.{column}) = 'array' THEN json_array_length({row}.{column}) ELSE 0 END
+        ELSE 0 END"""
+
+
+def stats_row_values(row: str, items_table: bool = True) -> List[str]:
+    """SQL expressions for one meetings row's contribution, in STATS_COLUMNS order.
+
+    The action-item count comes from the action_items table (see fts_row_values).
+    """
+    return [
+        "1",
+        _sentiment_is(row, "'positive'"),
+        "1 - (" + _sentiment_is(row, "'positive', 'negative'") + ")",
+        _sentiment_is(row, "'negative'"),
+        _json_score(row, f"json_extract({row}.sentiment, '$.score')"),
+        _json_score(row, "1"),
+        f"(SELECT COUNT(*) FROM action_items a WHERE a.meeting_id = {row}.id)"
+        if items_table else _json_length(row, "action_items"),
+        _json_length(row, "decisions"),
+    ]
+
+
+def stats_key(row: str) -> str:
+    """`user_id, day` of the rollup bucket a meetings row belongs to."""
+    return f"coalesce({row}.user_id, ''), date({row}.created_at)"
+
+
+def _stats_apply(row: str, sign: str, items_table: bool = True) -> str:
+    values = ", ".join(f"{sign}({v})" for v in stats_row_values(row, items_table))
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in STATS_COLUMNS)
+    return f"""INSERT INTO meeting_stats_daily (user_id, day, {", ".join(STATS_COLUMNS)})
+            SELECT {stats_key(row)}, {values} WHERE {row}.created_at IS NOT NULL
+            ON CONFLICT (user_id, day) DO UPDATE SET {updates}"""
+
+
+def _stats_prune(row: str) -> str:
+    return f"DELETE FROM meeting_stats_daily WHERE (user_id, day) = ({stats_key(row)}) AND meetings <= 0"
+
+
+def stats_rollup_select(items_table: bool = True) -> str:
+    """Rollup rows recomputed from scratch, shaped like meeting_stats_daily."""
+    sums = ", ".join(f"sum({v})" for v in stats_row_values("m", items_table))
+    return f"""SELECT {stats_key("m")}, {sums} FROM meetings m
+        WHERE m.created_at IS NOT NULL GROUP BY 1, 2"""
+
+
+def _create_stats_rollup(cur: sqlite3.Cursor) -> None:
+    statements = f"""
+        CREATE TABLE IF NOT EXISTS meeting_stats_daily (
+            user_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            meetings INTEGER NOT NULL DEFAULT 0,
+            positive INTEGER NOT NULL DEFAULT 0,
+            neutral INTEGER NOT NULL DEFAULT 0,
+            negative INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            scored INTEGER NOT NULL DEFAULT 0,
+            action_items INTEGER NOT NULL DEFAULT 0,
+            decisions INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS meeting_stats_ai AFTER INSERT ON meetings BEGIN
+            {_stats_apply("new", "+", False)};
+        END;
+        CREATE TRIGGER IF NOT EXISTS meeting_stats_ad AFTER DELETE ON meetings BEGIN
+            {_stats_apply("old", "-", False)};
+            {_stats_prune("old")};
+        END;
+        CREATE TRIGGER IF NOT EXISTS meeting_stats_au
+        AFTER UPDATE OF user_id, created_at, sentiment, action_items, decisions ON meetings BEGIN
+            {_stats_apply("old", "-", False)};
+            {_stats_prune("old")};
+            {_stats_apply("new", "+", False)};
+        END;
+        DELETE FROM meeting_stats_daily;
+        INSERT INTO meeting_stats_daily (user_id, day, {", ".join(STATS_COLUMNS)}) {stats_rollup_select(False)}
+    """
+    for statement in split_statements(statements):
+        cur.execute(statement)
+
+
+def action_items_select(row: str, source: str = "") -> str:
+    """SELECT producing action_items rows from the JSON array in `{row}.action_items`.
+
+    Anything that is not a JSON array contributes no rows; bare strings are
+    taken as the task text.
+    """
+    items = f"{row}.action_items"
+    task = "CASE j.type WHEN 'object' THEN json_extract(j.value, '$.task') ELSE j.value END"
+    return f"""SELECT {row}.id, {row}.user_id, j.key,
+            CASE j.type WHEN 'object' THEN json_extract(j.value, '$.assignee') END,
+            {task},
+            CASE j.type WHEN 'object' THEN json_extract(j.value, '$.due') END,
+            CASE j.type WHEN 'object' THEN json_extract(j.value, '$.context') END,
+            'open', {row}.created_at, {row}.created_at
+        FROM {source}json_each(coalesce(
+            CASE WHEN json_valid({items}) THEN CASE json_type({items}) WHEN 'array' THEN {items} END END, '[]')) AS j
+        WHERE j.type IN ('object', 'text') AND {task} IS NOT NULL"""
+
+
+ACTION_ITEM_COLUMNS = "meeting_id, user_id, position, assignee, task, due, context, status, created_at, updated_at"
+
+
+def _action_items_source_of_truth(cur: sqlite3.Cursor) -> None:
+    """Make the action_items table the only source for search text and stats counts.
+
+    The meetings.action_items JSON is kept as the model's original reply and
+    only seeds the table when a meeting is inserted. One insert trigger now
+    fills action_items before the search row and the rollup read from it.
+    Edits to an item's task or assignee refresh the meeting's search text.
+    Stats are subtracted before a meeting is deleted, while its items still exist.
+    """
+    statements = f"""
+        DROP TRIGGER IF EXISTS action_items_ai;
+        DROP TRIGGER IF EXISTS action_items_au;
+        DROP TRIGGER IF EXISTS meetings_fts_ai;
+        DROP TRIGGER IF EXISTS meetings_fts_au;
+        DROP TRIGGER IF EXISTS meeting_stats_ai;
+        DROP TRIGGER IF EXISTS meeting_stats_ad;
+        DROP TRIGGER IF EXISTS meeting_stats_au;
+        CREATE TRIGGER meetings_ai AFTER INSERT ON meetings BEGIN
+            INSERT INTO action_items ({ACTION_ITEM_COLUMNS}) {action_items_select("new")};
+            INSERT INTO meetings_fts ({FTS_COLUMNS}) VALUES ({fts_row_values("new")});
+            {_stats_apply("new", "+")};
+        END;
+        CREATE TRIGGER meetings_fts_au AFTER UPDATE OF title, transcript, summary, user_id ON meetings BEGIN
+            DELETE FROM meetings_fts WHERE rowid = old.id;
+            INSERT INTO meetings_fts ({FTS_COLUMNS}) VALUES ({fts_row_values("new")});
+        END;
+        CREATE TRIGGER meeting_stats_bd BEFORE DELETE ON meetings BEGIN
+            {_stats_apply("old", "-")};
+            {_stats_prune("old")};
+        END;
+        CREATE TRIGGER meeting_stats_au AFTER UPDATE OF user_id, created_at, sentiment, decisions ON meetings BEGIN
+            {_stats_apply("old", "-")};
+            {_stats_prune("old")};
+            {_stats_apply("new", "+")};
+        END;
+        CREATE TRIGGER action_items_fts_au AFTER UPDATE OF task, assignee ON action_items BEGIN
+            UPDATE meetings_fts SET action_text = (
+                SELECT group_concat(coalesce(a.assignee || ' ', '') || a.task, ' ')
+                FROM action_items a WHERE a.meeting_id = new.meeting_id
+            ) WHERE rowid = new.meeting_id;
+        END;
+        UPDATE meetings_fts SET action_text = (
+            SELECT group_concat(coalesce(a.assignee || ' ', '') || a.task, ' ')
+            FROM action_items a WHERE a.meeting_id = meetings_fts.rowid
+        ) WHERE rowid IN (SELECT meeting_id FROM action_items WHERE updated_at IS NOT created_at);
+        DELETE FROM meeting_stats_daily;
+        INSERT INTO meeting_stats_daily (user_id, day, {", ".join(STATS_COLUMNS)}) {stats_rollup_select()}
+    """
+    for statement in split_statements(statements):
+        cur.execute(statement)
+
+
+def index_meetings(cur: sqlite3.Cursor, lo: int, hi: int, items_table: bool = True) -> int:
+    """Add meetings with ids in [lo, hi] that are missing from meetings_fts; returns how many."""
+    cur.execute(
+        f"""INSERT INTO meetings_fts ({FTS_COLUMNS})
+            SELECT {fts_row_values("m", items_table)} FROM meetings m
+            WHERE m.id BETWEEN ? AND ?
+              AND NOT EXISTS (SELECT 1 FROM meetings_fts f WHERE f.rowid = m.id)""",
+        (lo, hi),
+    )
+    return cur.rowcount
+
+
+def _backfill_search_index(cur: sqlite3.Cursor, items_table: bool = True, batch: int = 5000) -> None:
+    last_id = 0
+    while True:
+        ids = cur.execute("SELECT id FROM meetings WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch)).fetchall()
+        if not ids:
+            return
+        index_meetings(cur, ids[0][0], ids[-1][0], items_table)
+        last_id = ids[-1][0]
+
+
+def _create_search_index(cur: sqlite3.Cursor) -> None:
+    statements = f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS meetings_fts USING fts5(
+            title, transcript, summary_text, action_text, user_id,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS meetings_fts_ai AFTER INSERT ON meetings BEGIN
+            INSERT INTO meetings_fts ({FTS_COLUMNS}) VALUES ({fts_row_values("new", False)});
+        END;
+        CREATE TRIGGER IF NOT EXISTS meetings_fts_ad AFTER DELETE ON meetings BEGIN
+            DELETE FROM meetings_fts WHERE rowid = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS meetings_fts_au
+        AFTER UPDATE OF title, transcript, summary, action_items, user_id ON meetings BEGIN
+            DELETE FROM meetings_fts WHERE rowid = old.id;
+            INSERT INTO meetings_fts ({FTS_COLUMNS}) VALUES ({fts_row_values("new", False)});
+        END
+    """
+    for statement in split_statements(statements):
+        cur.execute(statement)
+    # The action_items table does not exist yet at this version.
+    _backfill_search_index(cur, items_table=False)
+
+
+def _prefix_search_index(cur: sqlite3.Cursor) -> None:
+    """Recreate meetings_fts with prefix indexes so `term*` queries do not scan the vocabulary."""
+    cur.execute("DROP TABLE IF EXISTS meetings_fts")
+    cur.execute("""
+        CREATE VIRTUAL TABLE meetings_fts USING fts5(
+            title, transcript, summary_text, action_text, user_id,
+            prefix = '2 3 4',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    _backfill_search_index(cur)
+
+
+def _backfill_summary_preview(cur: sqlite3.Cursor, batch: int = 5000) -> None:
+    add_column(cur, "meetings", "summary_preview", "TEXT")
+    last_id = 0
+    while True:
+        rows = cur.execute(
+            "SELECT id, summary FROM meetings WHERE id > ? AND summary_preview IS NULL ORDER BY id LIMIT ?",
+            (last_id, batch),
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for meeting_id, summary in rows:
+            try:
+                preview = json.loads(summary)[:2] if summary else []
+            except (ValueError, TypeError):
+                preview = []
+            updates.append((json.dumps(preview), meeting_id))
+        cur.executemany("UPDATE meetings SET summary_preview = ? WHERE id = ?", updates)
+        last_id = rows[-1][0]
+
+
+MIGRATIONS: List[Migration] = [
+    (1, "create meetings and feedback", """
+        CREATE TABLE IF NOT EXISTS meetings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT,
+            user_id TEXT,
+            title TEXT,
+            date TEXT,
+            transcript TEXT,
+            summary TEXT,
+            action_items TEXT,
+            decisions TEXT,
+            sentiment TEXT,
+            share_token TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            user_email TEXT,
+            message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """),
+    (2, "meetings.analysis_key", lambda cur: add_column(cur, "meetings", "analysis_key", "TEXT")),
+    (3, "meetings.summary_preview", _backfill_summary_preview),
+    (4, "meeting list and share token indexes", """
+        CREATE INDEX IF NOT EXISTS idx_meetings_user_created
+            ON meetings (user_id, created_at DESC, id DESC, title, date, summary_preview);
+        CREATE INDEX IF NOT EXISTS idx_meetings_share_token ON meetings (share_token)
+    """),
+    (5, "meetings full-text index", _create_search_index),
+    (6, "background jobs", """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            user_id TEXT,
+            payload TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_after REAL,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            result TEXT,
+            error TEXT,
+            created_at REAL,
+            started_at REAL,
+            updated_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs (status, run_after);
+        CREATE INDEX IF NOT EXISTS idx_jobs_status_lease ON jobs (status, lease_expires_at)
+    """),
+    (7, "per-user daily stats rollup", _create_stats_rollup),
+    (8, "normalized action items", f"""
+        CREATE TABLE IF NOT EXISTS action_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            meeting_id INTEGER NOT NULL REFERENCES meetings (id) ON DELETE CASCADE,
+            user_id TEXT,
+            position INTEGER NOT NULL DEFAULT 0,
+            assignee TEXT COLLATE NOCASE,
+            task TEXT NOT NULL,
+            due TEXT,
+            context TEXT,
+            status TEXT NOT NULL DEFAULT 'open',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_action_items_user_status_due ON action_items (user_id, status, due);
+        CREATE INDEX IF NOT EXISTS idx_action_items_user_assignee ON action_items (user_id, assignee);
+        CREATE INDEX IF NOT EXISTS idx_action_items_meeting ON action_items (meeting_id, position);
+        CREATE TRIGGER IF NOT EXISTS action_items_ai AFTER INSERT ON meetings BEGIN
+            INSERT INTO action_items ({ACTION_ITEM_COLUMNS}) {action_items_select("new")};
+        END;
+        CREATE TRIGGER IF NOT EXISTS action_items_au AFTER UPDATE OF action_items ON meetings BEGIN
+            DELETE FROM action_items WHERE meeting_id = old.id;
+            INSERT INTO action_items ({ACTION_ITEM_COLUMNS}) {action_items_select("new")};
+        END;
+        INSERT INTO action_items ({ACTION_ITEM_COLUMNS})
+            {action_items_select("m", "meetings AS m, ")} ORDER BY m.id, j.key
+    """),
+    (9, "expiring key-value store", """
+        CREATE TABLE IF NOT EXISTS ttl_store (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_ttl_store_expires ON ttl_store (expires_at)
+    """),
+    (10, "email outbox", """
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            template TEXT NOT NULL,
+            to_email TEXT NOT NULL,
+            params TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            next_attempt_at REAL,
+            lease_expires_at REAL,
+            last_error TEXT,
+            created_at REAL,
+            sent_at REAL,
+            updated_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_status_next ON email_outbox (status, next_attempt_at);
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_status_lease ON email_outbox (status, lease_expires_at)
+    """),
+    (11, "action items table drives search and stats", _action_items_source_of_truth),
+    (12, "full-text prefix indexes", _prefix_search_index),
+    # The JSON is the model's original reply; item edits go to the action_items table.
+    (13, "meetings.action_items is read-only", """
+        CREATE TRIGGER IF NOT EXISTS meetings_action_items_bu BEFORE UPDATE OF action_items ON meetings
+        WHEN new.action_items IS NOT old.action_items BEGIN
+            SELECT RAISE(ABORT, 'meetings.action_items is read-only, update the action_items table');
+        END
+    """),
+]
@@ -0,0 +1,128 @@
+# streaming.py – Incremental parsing of streamed analysis JSON + SSE helpers
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Top-level array keys -> SSE event emitted for each completed element.
+ARRAY_EVENTS = {"summary": "summary", "action_items": "action_item", "decisions": "decision"}
+# Top-level object keys -> SSE event emitted once the whole object is complete.
+OBJECT_EVENTS = {"sentiment": "sentiment"}
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class AnalysisStreamParser:
+    """Tracks a streamed `{"summary": [...], ...}` reply one character at a time.
+
+    `feed()` returns `(event, value)` pairs for every summary point, action
+    item, decision and the sentiment object as soon as its closing character
+    arrives, without waiting for the rest of the document. Text before the
+    first `{` (such as a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._container: Optional[str] = None  # "array" / "object" for the current top-level value
+        self._value_start: Optional[int] = None  # start of a top-level object value (depth 1 -> 2)
+        self._item_start: Optional[int] = None  # start of the current array element (depth 2)
+        self.items: Dict[str, List[Any]] = {key: [] for key in ARRAY_EVENTS}
+        self.objects: Dict[str, Any] = {}
+
+    def _emit_item(self, end: int, events: List[Tuple[str, Any]]) -> None:
+        raw = self.buffer[self._item_start:end].strip()
+        self._item_start = None
+        if not raw or self._key not in ARRAY_EVENTS:
+            return
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        self.items[self._key].append(value)
+        events.append((ARRAY_EVENTS[self._key], value))
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        events: List[Tuple[str, Any]] = []
+        self.buffer += text
+        while self._pos < len(self.buffer) and not self._done:
+            i = self._pos
+            ch = self.buffer[i]
+            self._pos += 1
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(self.buffer[self._string_start:i + 1])
+                    elif self._depth == 2 and self._container == "array":
+                        self._emit_item(i + 1, events)
+                continue
+
+            if ch.isspace():
+                continue
+            if self._depth == 2 and self._container == "array" and self._item_start is None and ch not in ",]":
+                self._item_start = i
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                if self._depth == 1:
+                    self._container = "object" if ch == "{" else "array"
+                    self._value_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._done = True
+                elif self._depth == 1:
+                    if self._container == "array" and self._item_start is not None:
+                        self._emit_item(i, events)
+                    elif self._container == "object" and self._key in OBJECT_EVENTS:
+                        try:
+                            value = json.loads(self.buffer[self._value_start:i + 1])
+                        except ValueError:
+                            value = None
+                        if value is not None:
+                            self.objects[self._key] = value
+                            events.append((OBJECT_EVENTS[self._key], value))
+                    self._container = None
+                elif self._depth == 2 and self._container == "array":
+                    self._emit_item(i + 1, events)
+            elif ch == ":" and self._depth == 1:
+                self._expect_key = False
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+                self._container = None
+            elif ch == "," and self._depth == 2 and self._container == "array" and self._item_start is not None:
+                self._emit_item(i, events)
+        return events
+
+    def result(self) -> Dict[str, Any]:
+        """Everything parsed so far, in `AnalyzeResponse` shape."""
+        return {
+            "summary": self.items["summary"],
+            "action_items": self.items["action_items"],
+            "decisions": self.items["decisions"],
+            "sentiment": self.objects.get("sentiment", {"sentiment": "neutral", "score": 0.0}),
+        }
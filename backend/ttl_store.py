@@ -0,0 +1,199 @@
+# ttl_store.py – Expiring key-value stores (in-memory and SQLite-backed)
+import heapq
+import json
+import sys
+import time
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from storage import Database
+
+
+class TTLStore(ABC):
+    """Keys that disappear `ttl` seconds after they are set.
+
+    Backends implement the sync methods; handlers use the `a*` wrappers,
+    which the SQLite backend routes through the database threads.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, key: str) -> Optional[Any]:
+        """Delete `key` and return its live value, atomically."""
+
+    def delete(self, key: str) -> None:
+        self.pop(key)
+
+    @abstractmethod
+    def incr(self, key: str, ttl: float) -> Tuple[int, float]:
+        """Bump a counter that starts a fresh `ttl` window when absent; returns (count, expires_at)."""
+
+    async def _read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return fn(*args)
+
+    _write = _read
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await self._read(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: float) -> None:
+        await self._write(self.set, key, value, ttl)
+
+    async def apop(self, key: str) -> Optional[Any]:
+        return await self._write(self.pop, key)
+
+    async def adelete(self, key: str) -> None:
+        await self._write(self.delete, key)
+
+    async def aincr(self, key: str, ttl: float) -> Tuple[int, float]:
+        return await self._write(self.incr, key, ttl)
+
+
+class MemoryTTLStore(TTLStore):
+    """Per-process store with min-heaps of expiry times and a hard size cap.
+
+    Every operation first pops expired keys off the heaps, so memory never
+    holds more than the live set. Values and `incr` counters are capped at
+    `max_entries` each: past the cap the values closest to expiry are evicted
+    early, but counters are rate limits and are never evicted. A new counter
+    that finds the cap full of live counters fails closed with a count of
+    `sys.maxsize` for its window.
+    """
+
+    def __init__(self, max_entries: int = 100000, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._counters: Dict[str, Tuple[float, int]] = {}
+        self._counter_heap: List[Tuple[float, str]] = []
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._data) + len(self._counters)
+
+    @staticmethod
+    def _expire(data: Dict[str, Tuple[float, Any]], heap: List[Tuple[float, str]], now: float,
+                cap: Optional[int] = None) -> None:
+        while heap and (heap[0][0] <= now or (cap is not None and len(data) > cap)):
+            expires_at, key = heapq.heappop(heap)
+            entry = data.get(key)
+            if entry and entry[0] == expires_at:
+                del data[key]
+        # Overwritten keys leave stale heap entries behind; rebuild before they pile up.
+        if len(heap) > 2 * len(data) + 64:
+            heap[:] = [(exp, key) for key, (exp, _) in data.items()]
+            heapq.heapify(heap)
+
+    def _purge(self, now: float) -> None:
+        self._expire(self._data, self._heap, now, self.max_entries)
+        self._expire(self._counters, self._counter_heap, now)
+
+    @staticmethod
+    def _live(data: Dict[str, Tuple[float, Any]], key: str, now: float) -> Optional[Tuple[float, Any]]:
+        entry = data.get(key)
+        return entry if entry and entry[0] > now else None
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            now = self._clock()
+            self._purge(now)
+            entry = self._live(self._data, key, now) or self._live(self._counters, key, now)
+            return entry[1] if entry else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            now = self._clock()
+            self._counters.pop(key, None)
+            self._data[key] = (now + ttl, value)
+            heapq.heappush(self._heap, (now + ttl, key))
+            self._purge(now)
+
+    def pop(self, key: str) -> Optional[Any]:
+        with self._lock:
+            now = self._clock()
+            entry = self._live(self._data, key, now) or self._live(self._counters, key, now)
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+            self._purge(now)
+            return entry[1] if entry else None
+
+    def incr(self, key: str, ttl: float) -> Tuple[int, float]:
+        with self._lock:
+            now = self._clock()
+            self._purge(now)
+            entry = self._live(self._counters, key, now)
+            if entry:
+                expires_at, count = entry[0], entry[1] + 1
+            elif len(self._counters) >= self.max_entries:
+                return sys.maxsize, now + ttl
+            else:
+                expires_at, count = now + ttl, 1
+                heapq.heappush(self._counter_heap, (expires_at, key))
+            self._counters[key] = (expires_at, count)
+            return count, expires_at
+
+
+class SQLiteTTLStore(TTLStore):
+    """Store backed by the `ttl_store` table, shared by every worker process.
+
+    Expired rows are invisible to reads and deleted in small batches on each
+    write, so the table stays bounded by the live key set.
+    """
+
+    def __init__(self, db: Database, purge_batch: int = 100, clock: Callable[[], float] = time.time):
+        self.db = db
+        self.purge_batch = purge_batch
+        self._clock = clock
+
+    def _purge(self, cur, now: float) -> None:
+        cur.execute(
+            "DELETE FROM ttl_store WHERE key IN (SELECT key FROM ttl_store WHERE expires_at <= ? LIMIT ?)",
+            (now, self.purge_batch),
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self.db.fetchone("SELECT value FROM ttl_store WHERE key = ? AND expires_at > ?", (key, self._clock()))
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = self._clock()
+        with self.db.transaction() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO ttl_store (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl),
+            )
+            self._purge(cur, now)
+
+    def pop(self, key: str) -> Optional[Any]:
+        with self.db.transaction() as cur:
+            row = cur.execute("DELETE FROM ttl_store WHERE key = ? RETURNING value, expires_at", (key,)).fetchone()
+        return json.loads(row[0]) if row and row[1] > self._clock() else None
+
+    def incr(self, key: str, ttl: float) -> Tuple[int, float]:
+        now = self._clock()
+        with self.db.transaction() as cur:
+            count, expires_at = cur.execute(
+                """INSERT INTO ttl_store (key, value, expires_at) VALUES (?, '1', ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                       value = CASE WHEN expires_at > ? THEN CAST(value AS INTEGER) + 1 ELSE 1 END,
+                       expires_at = CASE WHEN expires_at > ? THEN expires_at ELSE excluded.expires_at END
+                   RETURNING CAST(value AS INTEGER), expires_at""",
+                (key, now + ttl, now, now),
+            ).fetchone()
+            self._purge(cur, now)
+        return count, expires_at
+
+    async def _read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await self.db.read(fn, *args)
+
+    async def _write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await self.db.write(fn, *args)
@@ -74,7 +74,7 @@ export default function Analyze() {
       // ✅ Get Firebase token
       const token = await getIdToken(auth.currentUser);
   
-      const res = await fetch(`${API_BASE}/api/v1/analyze`, {
+      const res = await fetch(`${API_BASE}/api/v1/analyze/stream`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -83,15 +83,43 @@ export default function Analyze() {
         body: JSON.stringify(payload),
       });
   
-      if (!res.ok) throw new Error("Analysis request failed");
+      if (!res.ok || !res.body) throw new Error("Analysis request failed");
   
-      const data = await res.json();
-      setResults({
-        summary: data.summary || [],
-        action_items: data.action_items || [],
-        decisions: data.decisions || [],
-        sentiment: data.sentiment || {},
-      });
+      // ⚡ Render each insight as soon as the server streams it
+      const partial = { summary: [], action_items: [], decisions: [], sentiment: {} };
+      const sections = { summary: "summary", action_item: "action_items", decision: "decisions" };
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let finished = false;
+      while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split("\n\n");
+        buffer = frames.pop();
+        for (const frame of frames) {
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(frame.match(/^data: (.*)$/m)?.[1] || "null");
+          if (event === "error") throw new Error(data?.detail || "Analysis failed");
+          if (event === "done") {
+            finished = true;
+            setResults({
+              summary: data.summary || [],
+              action_items: data.action_items || [],
+              decisions: data.decisions || [],
+              sentiment: data.sentiment || {},
+            });
+          } else if (event === "sentiment") {
+            partial.sentiment = data;
+            setResults({ ...partial });
+          } else if (sections[event]) {
+            partial[sections[event]] = [...partial[sections[event]], data];
+            setResults({ ...partial });
+          }
+        }
+      }
+      if (!finished) throw new Error("Analysis stream ended early");
     } catch (err) {
       console.error("❌ AI Analysis error:", err);
       alert("Failed to analyze transcript. Please try again.");
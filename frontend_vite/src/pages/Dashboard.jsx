@@ -48,6 +48,46 @@ const shimmerKeyframes = `
 }
 `;
 
+/* ---------- stats helpers (days come from /api/v1/stats, UTC YYYY-MM-DD) ---------- */
+const daysAgo = (n) => new Date(Date.now() - n * 86400000);
+const isoDay = (d) => d.toISOString().slice(0, 10);
+
+function sumDays(days, from, to, pick) {
+  const lo = isoDay(from);
+  const hi = isoDay(to);
+  return (days || []).filter((d) => d.day >= lo && d.day <= hi).reduce((acc, d) => acc + pick(d), 0);
+}
+
+function activitySeries(days, range) {
+  const pick = (d) => d.meetings;
+  if (range === "week") {
+    return [6, 5, 4, 3, 2, 1, 0].map((n) => {
+      const d = daysAgo(n);
+      return { label: d.toLocaleDateString(undefined, { weekday: "short", timeZone: "UTC" }), meetings: sumDays(days, d, d, pick) };
+    });
+  }
+  if (range === "month") {
+    return [3, 2, 1, 0].map((w) => ({
+      label: `Week ${4 - w}`,
+      meetings: sumDays(days, daysAgo(w * 7 + 6), daysAgo(w * 7), pick),
+    }));
+  }
+  const now = new Date();
+  return [...Array(12).keys()].reverse().map((m) => {
+    const start = new Date(Date.UTC(now.getUTCFullYear(), now.getUTCMonth() - m, 1));
+    const end = new Date(Date.UTC(now.getUTCFullYear(), now.getUTCMonth() - m + 1, 0));
+    return { label: start.toLocaleDateString(undefined, { month: "short", timeZone: "UTC" }), meetings: sumDays(days, start, end, pick) };
+  });
+}
+
+function trend(days, pick) {
+  const recent = sumDays(days, daysAgo(29), daysAgo(0), pick);
+  const previous = sumDays(days, daysAgo(59), daysAgo(30), pick);
+  if (!previous) return recent ? "new" : "0%";
+  const pct = Math.round(((recent - previous) / previous) * 100);
+  return `${pct >= 0 ? "+" : ""}${pct}%`;
+}
+
 export default function Dashboard() {
   const { theme, colorScheme } = useContext(ThemeContext);
   const { user } = useContext(UserContext);
@@ -55,37 +95,20 @@ export default function Dashboard() {
   const navigate = useNavigate();
   const [timeRange, setTimeRange] = useState("week");
 
+  const [stats, setStats] = useState(null);
   const chartData = {
-    week: [
-      { label: "Mon", meetings: 12 },
-      { label: "Tue", meetings: 15 },
-      { label: "Wed", meetings: 18 },
-      { label: "Thu", meetings: 14 },
-      { label: "Fri", meetings: 16 },
-      { label: "Sat", meetings: 4 },
-      { label: "Sun", meetings: 2 },
-    ],
-    month: [
-      { label: "Week 1", meetings: 54 },
-      { label: "Week 2", meetings: 48 },
-      { label: "Week 3", meetings: 60 },
-      { label: "Week 4", meetings: 58 },
-    ],
-    year: [
-      { label: "Jan", meetings: 220 },
-      { label: "Feb", meetings: 180 },
-      { label: "Mar", meetings: 240 },
-      { label: "Apr", meetings: 210 },
-      { label: "May", meetings: 300 },
-      { label: "Jun", meetings: 280 },
-    ],
+    week: activitySeries(stats?.days, "week"),
+    month: activitySeries(stats?.days, "month"),
+    year: activitySeries(stats?.days, "year"),
   };
 
+  const totals = stats?.totals;
+  const avgScore = totals?.sentiment?.average_score;
   const statsData = [
-    { icon: Mic, label: "Total Meetings", value: "248", change: "+12%", color: "#3B82F6" },
-    { icon: Brain, label: "AI Summaries", value: "186", change: "+8%", color: "#8B5CF6" },
-    { icon: Clock, label: "Hours Saved", value: "127", change: "+24%", color: "#22C55E" },
-    { icon: TrendingUp, label: "Insights", value: "342", change: "+18%", color: "#F59E0B" },
+    { icon: Mic, label: "Total Meetings", value: totals ? totals.meetings : "—", change: trend(stats?.days, (d) => d.meetings), color: "#3B82F6" },
+    { icon: Brain, label: "Action Items", value: totals ? totals.action_items : "—", change: trend(stats?.days, (d) => d.action_items), color: "#8B5CF6" },
+    { icon: Clock, label: "Decisions", value: totals ? totals.decisions : "—", change: trend(stats?.days, (d) => d.decisions), color: "#22C55E" },
+    { icon: TrendingUp, label: "Avg Sentiment", value: avgScore == null ? "—" : avgScore.toFixed(2), change: `${totals?.sentiment?.positive ?? 0} positive`, color: "#F59E0B" },
   ];
 
   const meetingTypes = [
@@ -163,6 +186,27 @@ useEffect(() => {
   return () => (mounted = false);
 }, [user]);
 
+  /* -------- load dashboard stats (server-side rollups) -------- */
+  useEffect(() => {
+    if (!auth.currentUser) return;
+    let mounted = true;
+    async function loadStats() {
+      try {
+        const token = await getIdToken(auth.currentUser);
+        const res = await fetch(`${API_BASE}/api/v1/stats?from=${isoDay(daysAgo(365))}`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (!res.ok) throw new Error(`Server responded ${res.status}`);
+        const data = await res.json();
+        if (mounted) setStats(data);
+      } catch (err) {
+        console.error("❌ Error fetching stats:", err);
+      }
+    }
+    loadStats();
+    return () => (mounted = false);
+  }, [user]);
+
   /* -------- fetch details -------- */
   const handleSelectMeeting = async (id) => {
     setSelectedMeeting(null);